@@ -0,0 +1,92 @@
+# Tiered routing: answer from the rule engine when it is confident, escalate to the LLM otherwise
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from prompt_compaction import narrative_lines
+
+logger = logging.getLogger(__name__)
+
+# Analysis modes accepted by the analysis pipeline
+MODE_RULES, MODE_LLM, MODE_TIERED = "rules", "llm", "tiered"
+
+# Use tiered routing for LLM requests unless the client asks otherwise
+TIERED_ROUTING = os.getenv("TIERED_ROUTING", "true").lower() == "true"
+
+# Rule-based results below this analysis_confidence are escalated to the LLM
+TIER_CONFIDENCE_THRESHOLD = float(os.getenv("TIER_CONFIDENCE_THRESHOLD", "0.9"))
+
+# Words of narrative the rules could not parse before the LLM is needed to read them
+TIER_MAX_UNPARSED_WORDS = int(os.getenv("TIER_MAX_UNPARSED_WORDS", "40"))
+
+# Report types whose content is narrative rather than lab values
+TIER_LLM_REPORT_TYPES = frozenset(
+    report_type.strip()
+    for report_type in os.getenv("TIER_LLM_REPORT_TYPES", "imaging,pathology,consultation").split(",")
+    if report_type.strip()
+)
+
+# Part of the tiered cache key, so changing the policy does not replay old routing decisions
+ROUTING_POLICY = f"c{TIER_CONFIDENCE_THRESHOLD:g}-w{TIER_MAX_UNPARSED_WORDS}-{'+'.join(sorted(TIER_LLM_REPORT_TYPES))}"
+
+
+def resolve_mode(use_llm: bool, tiered: Optional[bool] = None) -> str:
+    """Analysis mode for a request; tiered=None follows TIERED_ROUTING"""
+    if not use_llm:
+        return MODE_RULES
+    if TIERED_ROUTING if tiered is None else tiered:
+        return MODE_TIERED
+    return MODE_LLM
+
+
+def unparsed_word_count(text: str) -> int:
+    """Words on lines the rule-based extractors could not represent"""
+    return sum(len(line.split()) for line in narrative_lines(text))
+
+
+def escalation_reason(text: str, rule_result: Dict[str, Any]) -> Optional[str]:
+    """Why the rule-based result is not good enough to return, or None when it is"""
+    if rule_result.get("partial"):
+        # The budget ran out during the rules; there is no time left for the LLM either
+        return None
+    if rule_result.get("report_type") in TIER_LLM_REPORT_TYPES:
+        return f"narrative report type ({rule_result['report_type']})"
+    confidence = rule_result.get("analysis_confidence", 0.0)
+    if confidence < TIER_CONFIDENCE_THRESHOLD:
+        return f"low rule confidence ({confidence:.2f})"
+    unparsed_words = unparsed_word_count(text)
+    if unparsed_words > TIER_MAX_UNPARSED_WORDS:
+        return f"unrecognized content ({unparsed_words} words)"
+    return None
+
+
+def routing_info(mode: str, tier: str, reason: Optional[str] = None, fallback: bool = False) -> Dict[str, Any]:
+    """Routing metadata attached to every analysis result"""
+    return {"mode": mode, "tier": tier, "escalation_reason": reason, "fallback": fallback}
+
+
+_route_counts = Counter()
+_route_lock = threading.Lock()
+
+
+def record_route(routing: Dict[str, Any]):
+    """Count which tier answered a freshly computed analysis"""
+    key = f"{routing['mode']}:{'fallback' if routing['fallback'] else routing['tier']}"
+    with _route_lock:
+        _route_counts[key] += 1
+
+
+def routing_status() -> Dict[str, Any]:
+    with _route_lock:
+        counts = dict(_route_counts)
+    tiered_total = sum(count for key, count in counts.items() if key.startswith(MODE_TIERED))
+    return {
+        "tiered_by_default": TIERED_ROUTING,
+        "confidence_threshold": TIER_CONFIDENCE_THRESHOLD,
+        "max_unparsed_words": TIER_MAX_UNPARSED_WORDS,
+        "llm_report_types": sorted(TIER_LLM_REPORT_TYPES),
+        "answered": counts,
+        "tiered_rule_share": round(counts.get(f"{MODE_TIERED}:rules", 0) / tiered_total, 2) if tiered_total else None
+    }
@@ -0,0 +1,146 @@
+# Server-side store of analyses, so follow-up requests can send an analysis_id instead of the whole result
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Optional
+
+from result_model import dumps
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_STORE_PATH = os.getenv("ANALYSIS_STORE_PATH", os.path.join("data", "analysis_store.sqlite3"))
+ANALYSIS_STORE_TTL_SECONDS = float(os.getenv("ANALYSIS_STORE_TTL_HOURS", "24")) * 3600
+ANALYSIS_STORE_MAX_ENTRIES = int(os.getenv("ANALYSIS_STORE_MAX_ENTRIES", "10000"))
+
+# Items of each list kept for follow-up prompts
+FOLLOWUP_LIST_LIMIT = 12
+
+
+def followup_context(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The parts of an LLM or rule-based analysis that follow-up endpoints use:
+    summary, findings, risk, recommendations and the precomputed lab values
+    and conditions. Raw model output and per-value narratives are left out.
+    """
+    patient_summary = analysis.get("patient_summary") or {}
+    doctor_summary = analysis.get("doctor_summary") or {}
+    clinical_assessment = doctor_summary.get("clinical_assessment") or {}
+
+    summary = analysis.get("summary") or " ".join(patient_summary.get("key_findings", [])[:4])
+    findings = analysis.get("findings") or clinical_assessment.get("significant_findings") or []
+    risk_assessment = analysis.get("risk_assessment") or doctor_summary.get("risk_assessment") or {}
+    recommendations = analysis.get("recommendations") or patient_summary.get("recommendations") or []
+    conditions = [
+        {"name": condition.get("name"), "confidence": condition.get("confidence")}
+        for condition in patient_summary.get("detected_conditions", [])
+    ]
+    lab_values = {
+        name: {"value": result.get("value"), "unit": result.get("unit", "")}
+        for name, result in (analysis.get("extracted_values") or {}).items()
+    }
+
+    return {
+        "summary": summary or "Medical analysis completed",
+        "report_type": analysis.get("report_type"),
+        "findings": findings[:FOLLOWUP_LIST_LIMIT],
+        "risk_assessment": {
+            "overall_risk": risk_assessment.get("overall_risk"),
+            "risk_factors": list(risk_assessment.get("risk_factors", []))[:FOLLOWUP_LIST_LIMIT]
+        },
+        "recommendations": recommendations[:FOLLOWUP_LIST_LIMIT],
+        "lab_values": lab_values,
+        "conditions": conditions,
+        "ai_powered": bool(analysis.get("ai_powered"))
+    }
+
+
+class AnalysisStore:
+    """Compressed follow-up contexts in a local SQLite file, with TTL and oldest-first eviction"""
+
+    def __init__(self, db_path: str = ANALYSIS_STORE_PATH, ttl_seconds: float = ANALYSIS_STORE_TTL_SECONDS, max_entries: int = ANALYSIS_STORE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the filesystem; caller holds the lock
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS analyses (
+                        id TEXT PRIMARY KEY,
+                        context BLOB NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_expires_at ON analyses (expires_at)")
+        return self._conn
+
+    def put(self, analysis: Dict[str, Any], analysis_id: Optional[str] = None) -> str:
+        """Store the follow-up context of an analysis and return its id"""
+        analysis_id = analysis_id or uuid.uuid4().hex
+        blob = zlib.compress(dumps(followup_context(analysis)))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analyses (id, context, expires_at) VALUES (?, ?, ?)",
+                    (analysis_id, blob, now + self.ttl_seconds)
+                )
+                conn.execute("DELETE FROM analyses WHERE expires_at < ?", (now,))
+                overflow = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM analyses WHERE id IN (SELECT id FROM analyses ORDER BY expires_at LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+        return analysis_id
+
+    def refresh(self, analysis_id: str) -> bool:
+        """Restart an entry's TTL; False if it is no longer stored"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE analyses SET expires_at = ? WHERE id = ? AND expires_at >= ?",
+                    (time.time() + self.ttl_seconds, analysis_id, time.time())
+                )
+        return cursor.rowcount > 0
+
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT context FROM analyses WHERE id = ? AND expires_at >= ?", (analysis_id, time.time())
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row is not None else None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(context)), 0) FROM analyses").fetchone()
+        return {"entries": entries, "bytes": size, "max_entries": self.max_entries, "evictions": self.evictions}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global analysis store shared by the API
+analysis_store = AnalysisStore()
@@ -1,16 +1,27 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import uvicorn
-from intelligent_analyzer import MedicalTextAnalyzer
-from llm_analyzer import analyze_medical_document_llm, chat_with_medical_ai, get_health_insights, check_ai_status, generate_medical_report
+from intelligent_analyzer import MedicalTextAnalyzer, ANALYZER_VERSION
+from llm_analyzer import ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, analyze_medical_document_llm_async, chat_with_medical_ai_async, stream_chat_with_medical_ai, get_health_insights_async, check_ai_status, generate_medical_report_async, close_llm_transport, llm_circuit_status
+from llm_scheduler import PRIORITY_BATCH, PRIORITY_STANDARD
+from circuit_breaker import CircuitOpenError
+from analysis_routing import MODE_LLM, MODE_RULES, MODE_TIERED, ROUTING_POLICY, escalation_reason, record_route, resolve_mode, routing_info, routing_status
+from deadlines import Deadline, DeadlineExceeded, resolve_deadline
+from execution import SingleFlight, run_blocking, executor_status, shutdown_executor
+from pdf_extraction import pdf_engine, extract_pdf_text
+from uploads import MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES, SpooledFile, spool_upload, spooled_upload, upload_too_large
+from job_queue import job_queue, JOB_UPLOAD_DIR, COMPLETED, FAILED
+from caching import analysis_cache, prompt_cache, sha256_text
+from analysis_store import analysis_store, followup_context
+from result_model import dumps, dumps_text
+import asyncio
+import json
 import logging
-import PyPDF2
-import io
 import os
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -36,9 +47,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse uploads whose declared size exceeds the cap before the body is read"""
+    max_bytes = MAX_BATCH_UPLOAD_BYTES if request.url.path == "/analyze-batch" else MAX_UPLOAD_BYTES
+    if upload_too_large(request.headers.get("content-length"), max_bytes):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB."}
+        )
+    return await call_next(request)
+
+class AnalysisJSONResponse(JSONResponse):
+    """JSON response for analyses: result records are written straight to bytes, no generic encoding pass"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
 # Initialize analyzers
 legacy_analyzer = MedicalTextAnalyzer()
 
+# Identical analyses already in flight are awaited rather than started again
+analysis_flights = SingleFlight("analysis")
+
+# Default and maximum number of documents a batch request analyzes at once
+BATCH_CONCURRENCY = max(1, int(os.getenv("BATCH_CONCURRENCY", "4")))
+BATCH_MAX_CONCURRENCY = max(BATCH_CONCURRENCY, int(os.getenv("BATCH_MAX_CONCURRENCY", "16")))
+BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", "100"))
+
+# Seconds between keep-alive comments on an idle job event stream
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+@app.on_event("startup")
+async def startup_event():
+    await job_queue.start(process_analysis_job)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop()
+    await close_llm_transport()
+    shutdown_executor()
+    pdf_engine.shutdown()
+    analysis_store.close()
+
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
     message: str
@@ -49,28 +100,185 @@ class TextAnalysisRequest(BaseModel):
     text: str
     filename: Optional[str] = "text_input.txt"
     use_llm: Optional[bool] = True
+    tiered: Optional[bool] = None
+    speculative: Optional[bool] = False
 
 class HealthInsightsRequest(BaseModel):
-    analysis_data: dict
+    analysis_id: Optional[str] = None
+    analysis_data: Optional[dict] = None
 
 class MedicalReportRequest(BaseModel):
-    analysis_data: dict
+    analysis_id: Optional[str] = None
+    analysis_data: Optional[dict] = None
     patient_info: Optional[dict] = None
 
-def extract_text_from_pdf(pdf_content):
-    """Extract text content from PDF file"""
+def extract_text_from_pdf(pdf_source):
+    """Extract text content from PDF bytes or a spooled PDF file path"""
     try:
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        text_content = ""
-        for page in pdf_reader.pages:
-            text_content += page.extract_text() + "\n"
-        
-        return text_content.strip()
+        return extract_pdf_text(pdf_source).strip()
     except Exception as e:
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
+async def _llm_analysis(text_content: str, priority: int, deadline: Optional[Deadline]):
+    """
+    LLM analysis, or None when the rule-based result has to be used instead,
+    together with whether the LLM call ran out of its share of the deadline
+    """
+    try:
+        logger.info("Attempting LLM-powered analysis")
+        llm_call = analyze_medical_document_llm_async(text_content, priority)
+        analysis_result = await (deadline.run_stage("llm", llm_call) if deadline is not None else llm_call)
+        if analysis_result.get("ai_powered"):
+            logger.info("✅ LLM analysis completed successfully")
+            return analysis_result, False
+        logger.warning("⚠️ LLM analysis unavailable, falling back to legacy")
+    except CircuitOpenError:
+        logger.info("⚡ LLM circuit open, using rule-based analysis")
+    except DeadlineExceeded:
+        logger.warning("⏱️ LLM analysis ran out of time, returning rule-based result")
+        return None, True
+    except Exception as llm_error:
+        logger.warning(f"⚠️ LLM analysis failed: {str(llm_error)}, falling back to legacy")
+    return None, False
+
+async def run_analysis_pipeline(text_content: str, filename: str, mode: str, priority: int = PRIORITY_STANDARD, deadline: Optional[Deadline] = None):
+    """
+    Run the analysis for a mode: rule-based only, LLM with rule-based
+    fallback, or tiered (rules first, LLM only when the rule-based result
+    is not good enough). If the LLM call outlives its share of the deadline,
+    the rule-based result is returned marked as partial.
+    """
+    logger.info(f"Analysis requested with mode={mode}")
+    rule_result = None
+    reason = None
+    if mode == MODE_TIERED:
+        rule_result = await run_blocking(legacy_analyzer.analyze_medical_document, text_content, filename, deadline)
+        reason = escalation_reason(text_content, rule_result)
+        if reason is None:
+            logger.info("✅ Rule-based analysis is sufficient, skipping LLM")
+            rule_result["routing"] = routing_info(mode, "rules")
+            return rule_result, "Rule-based"
+        logger.info(f"⬆️ Escalating to LLM: {reason}")
+    
+    llm_timed_out = False
+    if mode != MODE_RULES:
+        analysis_result, llm_timed_out = await _llm_analysis(text_content, priority, deadline)
+        if analysis_result is not None:
+            analysis_result["routing"] = routing_info(mode, "llm", reason)
+            return analysis_result, "LLM-powered"
+    else:
+        logger.info("Using legacy rule-based analysis")
+    
+    if rule_result is None:
+        rule_result = await run_blocking(legacy_analyzer.analyze_medical_document, text_content, filename, deadline)
+    if llm_timed_out:
+        rule_result["partial"] = True
+        rule_result["deadline_exceeded"] = "llm"
+    rule_result["routing"] = routing_info(mode, "rules", reason, fallback=mode != MODE_RULES)
+    return rule_result, "Rule-based"
+
+async def store_for_followups(analysis_result: dict, analysis_id: Optional[str] = None) -> Optional[str]:
+    """
+    Keep an analysis server-side for follow-up requests and return its id.
+    Cacheable results use their cache key as id, so repeat analyses of a
+    document share one entry. A store failure never fails the analysis.
+    """
+    try:
+        if analysis_id is not None and await asyncio.to_thread(analysis_store.refresh, analysis_id):
+            return analysis_id
+        return await asyncio.to_thread(analysis_store.put, analysis_result, analysis_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Analysis store write failed: {str(e)}")
+        return None
+
+async def load_followup_context(analysis_id: Optional[str], analysis_data: Optional[dict]) -> dict:
+    """Follow-up context from the analysis store, or derived from an analysis sent inline"""
+    if analysis_id:
+        context = await asyncio.to_thread(analysis_store.get, analysis_id)
+        if context is None:
+            raise HTTPException(status_code=404, detail="Analysis not found or expired. Please analyze the document again.")
+        return context
+    if analysis_data:
+        return followup_context(analysis_data)
+    raise HTTPException(status_code=400, detail="Provide an analysis_id or analysis_data")
+
+def compact_chat_context(context: Optional[str]) -> Optional[str]:
+    """A whole analysis sent as chat context is reduced to its follow-up context"""
+    try:
+        data = json.loads(context) if context else None
+    except ValueError:
+        return context
+    return json.dumps(followup_context(data)) if isinstance(data, dict) else context
+
+def analysis_version(mode: str) -> str:
+    """Versions of everything that can shape a result in this mode; part of the cache key"""
+    llm_version = f"{ANALYSIS_MODEL}/{ANALYSIS_PROMPT_VERSION}"
+    if mode == MODE_TIERED:
+        return f"{ANALYZER_VERSION}+{llm_version}+{ROUTING_POLICY}"
+    return llm_version if mode == MODE_LLM else ANALYZER_VERSION
+
+async def run_cached_analysis(content_hash: str, filename: str, mode: str, load_text, priority: int = PRIORITY_STANDARD, deadline: Optional[Deadline] = None):
+    """
+    Serve an analysis from the content-addressed cache, join an identical
+    analysis already in flight, or load the text (awaiting `load_text()`),
+    analyze it and cache the result
+    """
+    cache_key = analysis_cache.make_key(content_hash, mode, analysis_version(mode))
+    
+    cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+    if cached is not None:
+        logger.info(f"⚡ Analysis cache hit for {filename}")
+        analysis_id = await store_for_followups(cached["analysis"], cache_key)
+        return cached["analysis"], cached["analysis_type"], "hit", analysis_id
+    
+    async def analyze_and_store():
+        text_content = await load_text()
+        analysis_result, analysis_type = await run_analysis_pipeline(text_content, filename, mode, priority, deadline)
+        record_route(analysis_result["routing"])
+        
+        # Fallback and deadline-truncated results should be retried next time, not replayed
+        cacheable = not analysis_result["routing"]["fallback"] and not analysis_result.get("partial")
+        if cacheable:
+            await asyncio.to_thread(analysis_cache.set, cache_key, {"analysis": analysis_result, "analysis_type": analysis_type})
+        analysis_id = await store_for_followups(analysis_result, cache_key if cacheable else None)
+        return analysis_result, analysis_type, analysis_id
+    
+    (analysis_result, analysis_type, analysis_id), shared = await analysis_flights.do(cache_key, analyze_and_store)
+    return analysis_result, analysis_type, "coalesced" if shared else "miss", analysis_id
+
+async def run_speculative_analysis(content_hash: str, filename: str, load_text, deadline: Optional[Deadline] = None):
+    """
+    Start the LLM analysis as a job and answer with the rule-based analysis
+    meanwhile, plus an upgrade handle for fetching the LLM result from the
+    job. A cached LLM result is returned directly, without an upgrade.
+    """
+    llm_key = analysis_cache.make_key(content_hash, MODE_LLM, analysis_version(MODE_LLM))
+    cached = await asyncio.to_thread(analysis_cache.get, llm_key)
+    if cached is not None:
+        logger.info(f"⚡ LLM analysis cache hit for {filename}, no upgrade needed")
+        analysis_id = await store_for_followups(cached["analysis"], llm_key)
+        return cached["analysis"], cached["analysis_type"], "hit", analysis_id, None
+    
+    text_content = await load_text()
+    payload = {
+        "filename": filename,
+        "text": text_content,
+        "content_hash": content_hash,
+        "use_llm": True,
+        "tiered": False,
+        "priority": PRIORITY_STANDARD
+    }
+    job_id = await job_queue.start_now("analysis", payload, ["analysis"])
+    
+    async def loaded_text():
+        return text_content
+    
+    analysis_result, analysis_type, cache_status, analysis_id = await run_cached_analysis(
+        content_hash, filename, MODE_RULES, loaded_text, deadline=deadline
+    )
+    upgrade = {"job_id": job_id, "status_url": f"/jobs/{job_id}", "events_url": f"/jobs/{job_id}/events"}
+    return analysis_result, analysis_type, cache_status, analysis_id, upgrade
+
 @app.get("/")
 async def root():
     return {
@@ -91,7 +299,14 @@ async def health_check():
         "features": {
             "rag": bool(os.getenv('ENABLE_RAG', 'true').lower() == 'true'),
             "chatbot": bool(os.getenv('ENABLE_CHATBOT', 'true').lower() == 'true')
-        }
+        },
+        "execution": {**executor_status(), "pdf_extraction_workers": pdf_engine.workers},
+        "job_queue": await asyncio.to_thread(job_queue.status),
+        "analysis_cache": await asyncio.to_thread(analysis_cache.status),
+        "coalescing": analysis_flights.status(),
+        "analysis_store": await asyncio.to_thread(analysis_store.status),
+        "llm_circuit": llm_circuit_status(),
+        "routing": routing_status()
     }
 
 @app.get("/ai-status")
@@ -99,49 +314,70 @@ async def ai_status():
     """Check AI configuration status"""
     return check_ai_status()
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and sizes for the analysis and prompt caches"""
+    return {
+        "analysis_cache": await asyncio.to_thread(analysis_cache.status),
+        "prompt_cache": await asyncio.to_thread(prompt_cache.status),
+        "coalescing": analysis_flights.status()
+    }
+
 @app.post("/analyze")
-async def analyze_document(file: UploadFile = File(...), use_llm: bool = True):
+async def analyze_document(
+    file: UploadFile = File(...),
+    use_llm: bool = True,
+    tiered: Optional[bool] = None,
+    speculative: bool = False,
+    x_deadline_ms: Optional[int] = Header(None, gt=0)
+):
+    deadline = resolve_deadline("analyze", x_deadline_ms)
+    speculative = bool(speculative and use_llm and (os.getenv('OPENAI_API_KEY') or os.getenv('ANTHROPIC_API_KEY')))
     try:
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Please upload a PDF file. Other formats are not supported yet.")
         
-        # Read file content
-        content = await file.read()
-        
         logger.info(f"Analyzing PDF document: {file.filename}")
         
-        # Extract text from PDF
-        try:
-            text_content = extract_text_from_pdf(content)
-            if not text_content.strip():
-                raise HTTPException(status_code=400, detail="No text found in the PDF. Please ensure the PDF contains readable text.")
-        except Exception as e:
-            logger.error(f"PDF extraction error: {str(e)}")
-            raise HTTPException(status_code=400, detail=f"Failed to extract text from PDF: {str(e)}")
-        
-        # Choose analysis method
-        logger.info(f"Analysis requested with use_llm={use_llm}")
-        if use_llm:
-            try:
-                logger.info("Attempting LLM-powered analysis")
-                analysis_result = analyze_medical_document_llm(text_content)
-                logger.info("✅ LLM analysis completed successfully")
-            except Exception as llm_error:
-                logger.warning(f"⚠️ LLM analysis failed: {str(llm_error)}, falling back to legacy")
-                analysis_result = legacy_analyzer.analyze_medical_document(text_content, file.filename)
-        else:
-            logger.info("Using legacy rule-based analysis")
-            analysis_result = legacy_analyzer.analyze_medical_document(text_content, file.filename)
+        # Stream the upload to disk; text is only extracted on a cache miss
+        async with spooled_upload(file) as spooled:
+            async def load_text():
+                try:
+                    text_content = await deadline.run_stage("extraction", run_blocking(extract_text_from_pdf, spooled.path))
+                    if not text_content.strip():
+                        raise HTTPException(status_code=400, detail="No text found in the PDF. Please ensure the PDF contains readable text.")
+                except DeadlineExceeded as e:
+                    raise HTTPException(status_code=504, detail=str(e))
+                except Exception as e:
+                    logger.error(f"PDF extraction error: {str(e)}")
+                    raise HTTPException(status_code=400, detail=f"Failed to extract text from PDF: {str(e)}")
+                return text_content
+            
+            # Choose analysis method
+            upgrade = None
+            if speculative:
+                analysis_result, analysis_type, cache_status, analysis_id, upgrade = await run_speculative_analysis(
+                    spooled.sha256, file.filename, load_text, deadline
+                )
+            else:
+                analysis_result, analysis_type, cache_status, analysis_id = await run_cached_analysis(
+                    spooled.sha256, file.filename, resolve_mode(use_llm, tiered), load_text, deadline=deadline
+                )
         
         logger.info("Analysis completed successfully")
         
-        return JSONResponse(content={
+        response = {
             "success": True,
             "filename": file.filename,
             "analysis": analysis_result,
-            "analysis_type": "LLM-powered" if use_llm else "Rule-based"
-        })
+            "analysis_type": analysis_type,
+            "analysis_id": analysis_id,
+            "cache": cache_status
+        }
+        if speculative:
+            response["upgrade"] = upgrade
+        return AnalysisJSONResponse(content=response)
         
     except HTTPException:
         raise
@@ -150,7 +386,8 @@ async def analyze_document(file: UploadFile = File(...), use_llm: bool = True):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @app.post("/analyze-text")
-async def analyze_text(request: TextAnalysisRequest):
+async def analyze_text(request: TextAnalysisRequest, x_deadline_ms: Optional[int] = Header(None, gt=0)):
+    deadline = resolve_deadline("analyze_text", x_deadline_ms)
     try:
         text_content = request.text
         filename = request.filename
@@ -162,26 +399,259 @@ async def analyze_text(request: TextAnalysisRequest):
         logger.info("Analyzing text input")
         
         # Choose analysis method
-        if use_llm and (os.getenv('OPENAI_API_KEY') or os.getenv('ANTHROPIC_API_KEY')):
-            logger.info("Using LLM-powered text analysis")
-            analysis_result = analyze_medical_document_llm(text_content)
+        use_llm = bool(use_llm and (os.getenv('OPENAI_API_KEY') or os.getenv('ANTHROPIC_API_KEY')))
+        
+        async def load_text():
+            return text_content
+        
+        upgrade = None
+        speculative = bool(request.speculative and use_llm)
+        if speculative:
+            analysis_result, analysis_type, cache_status, analysis_id, upgrade = await run_speculative_analysis(
+                sha256_text(text_content), filename, load_text, deadline
+            )
         else:
-            logger.info("Using legacy rule-based text analysis")
-            analysis_result = legacy_analyzer.analyze_medical_document(text_content, filename)
+            analysis_result, analysis_type, cache_status, analysis_id = await run_cached_analysis(
+                sha256_text(text_content), filename, resolve_mode(use_llm, request.tiered), load_text, deadline=deadline
+            )
         
         logger.info("Text analysis completed successfully")
         
-        return JSONResponse(content={
+        response = {
             "success": True,
             "filename": filename,
             "analysis": analysis_result,
-            "analysis_type": "LLM-powered" if use_llm else "Rule-based"
-        })
+            "analysis_type": analysis_type,
+            "analysis_id": analysis_id,
+            "cache": cache_status
+        }
+        if speculative:
+            response["upgrade"] = upgrade
+        return AnalysisJSONResponse(content=response)
         
     except Exception as e:
         logger.error(f"Error analyzing text: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Text analysis failed: {str(e)}")
 
+async def _analyze_batch_item(
+    index: int,
+    filename: str,
+    mode: str,
+    pdf: Optional[SpooledFile] = None,
+    text: Optional[str] = None,
+    deadline_ms: Optional[int] = None
+) -> dict:
+    """Analyze one batch document, reporting failures as a result line instead of raising"""
+    # Each document's budget starts when it begins, not when the batch was queued
+    deadline = resolve_deadline("batch_item", deadline_ms)
+    
+    async def load_text():
+        content = await deadline.run_stage("extraction", run_blocking(extract_text_from_pdf, pdf.path)) if pdf is not None else text
+        if not content or not content.strip():
+            raise ValueError("No text content found in document")
+        return content
+    
+    try:
+        content_hash = pdf.sha256 if pdf is not None else sha256_text(text)
+        analysis_result, analysis_type, cache_status, analysis_id = await run_cached_analysis(
+            content_hash, filename, mode, load_text, PRIORITY_BATCH, deadline
+        )
+        return {
+            "index": index,
+            "success": True,
+            "filename": filename,
+            "analysis": analysis_result,
+            "analysis_type": analysis_type,
+            "analysis_id": analysis_id,
+            "cache": cache_status
+        }
+    except Exception as e:
+        logger.error(f"Batch item {index} ({filename}) failed: {str(e)}")
+        return {"index": index, "success": False, "filename": filename, "error": str(e)}
+
+@app.post("/analyze-batch")
+async def analyze_batch(
+    files: List[UploadFile] = File([]),
+    texts: List[str] = Form([]),
+    use_llm: bool = True,
+    tiered: Optional[bool] = None,
+    concurrency: Optional[int] = None,
+    x_deadline_ms: Optional[int] = Header(None, gt=0)
+):
+    """
+    Analyze many PDFs and/or texts concurrently, streaming one NDJSON line per
+    document as soon as it finishes, followed by a summary line
+    """
+    document_count = len(files) + len(texts)
+    
+    if document_count == 0:
+        raise HTTPException(status_code=400, detail="Provide at least one PDF file or text to analyze")
+    if document_count > BATCH_MAX_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"Too many documents. Maximum batch size is {BATCH_MAX_DOCUMENTS}.")
+    
+    limit = min(max(1, concurrency or BATCH_CONCURRENCY), BATCH_MAX_CONCURRENCY)
+    mode = resolve_mode(use_llm, tiered)
+    logger.info(f"Analyzing batch of {document_count} documents with concurrency={limit}")
+    
+    # Spool uploads before streaming starts; form files are not guaranteed to outlive the handler
+    items = []
+    spooled_paths = []
+    try:
+        for upload in files:
+            index = len(items)
+            if not upload.filename.lower().endswith('.pdf'):
+                items.append({"index": index, "filename": upload.filename, "error": "Only PDF files are supported"})
+                continue
+            try:
+                spooled = await spool_upload(upload)
+            except HTTPException as e:
+                items.append({"index": index, "filename": upload.filename, "error": e.detail})
+                continue
+            spooled_paths.append(spooled.path)
+            items.append({"index": index, "filename": upload.filename, "pdf": spooled})
+        for text in texts:
+            index = len(items)
+            items.append({"index": index, "filename": f"text_input_{index}.txt", "text": text})
+    except BaseException:
+        for pdf_path in spooled_paths:
+            os.unlink(pdf_path)
+        raise
+    
+    async def stream_results():
+        semaphore = asyncio.Semaphore(limit)
+        
+        async def run_item(item: dict) -> dict:
+            if "error" in item:
+                return {"index": item["index"], "success": False, "filename": item["filename"], "error": item["error"]}
+            async with semaphore:
+                return await _analyze_batch_item(
+                    item["index"], item["filename"], mode,
+                    pdf=item.get("pdf"), text=item.get("text"), deadline_ms=x_deadline_ms
+                )
+        
+        tasks = [asyncio.create_task(run_item(item)) for item in items]
+        succeeded = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                succeeded += 1 if result["success"] else 0
+                yield dumps_text(result) + "\n"
+            yield json.dumps({"summary": True, "total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            for pdf_path in spooled_paths:
+                try:
+                    os.unlink(pdf_path)
+                except OSError:
+                    pass
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+async def process_analysis_job(job: dict, report_stage) -> dict:
+    """Job queue handler: extraction (for PDFs) followed by analysis"""
+    payload = job["payload"]
+    filename = payload["filename"]
+    deadline = resolve_deadline("job", payload.get("deadline_ms"))
+    
+    async def load_text():
+        if payload.get("pdf_path"):
+            await report_stage("extraction")
+            text_content = await deadline.run_stage("extraction", run_blocking(extract_text_from_pdf, payload["pdf_path"]))
+        else:
+            text_content = payload["text"]
+        if not text_content.strip():
+            raise ValueError("No text found in the document. Please ensure it contains readable text.")
+        await report_stage("analysis")
+        return text_content
+    
+    analysis_result, analysis_type, cache_status, analysis_id = await run_cached_analysis(
+        payload["content_hash"], filename, resolve_mode(payload["use_llm"], payload.get("tiered")), load_text,
+        payload.get("priority", PRIORITY_BATCH), deadline
+    )
+    return {
+        "success": True,
+        "filename": filename,
+        "analysis": analysis_result,
+        "analysis_type": analysis_type,
+        "analysis_id": analysis_id,
+        "cache": cache_status
+    }
+
+@app.post("/jobs", status_code=202)
+async def submit_analysis_job(
+    file: Optional[UploadFile] = File(None),
+    text: Optional[str] = Form(None),
+    use_llm: bool = True,
+    tiered: Optional[bool] = None,
+    x_deadline_ms: Optional[int] = Header(None, gt=0)
+):
+    """Queue a PDF or text analysis and return a job id immediately"""
+    if file is not None:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="Please upload a PDF file. Other formats are not supported yet.")
+        os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+        spooled = await spool_upload(file, directory=JOB_UPLOAD_DIR)
+        payload = {"filename": file.filename, "pdf_path": spooled.path, "content_hash": spooled.sha256, "use_llm": use_llm, "tiered": tiered, "deadline_ms": x_deadline_ms}
+        stages = ["extraction", "analysis"]
+    elif text and text.strip():
+        payload = {"filename": "text_input.txt", "text": text, "content_hash": sha256_text(text), "use_llm": use_llm, "tiered": tiered, "deadline_ms": x_deadline_ms}
+        stages = ["analysis"]
+    else:
+        raise HTTPException(status_code=400, detail="Provide a PDF file or text to analyze")
+    
+    job_id = await job_queue.submit("analysis", payload, stages)
+    return {"success": True, "job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Return a job's status, per-stage progress and, once finished, its result"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    job.pop("payload")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str):
+    """
+    Stream a job as Server-Sent Events: a progress event on every stage
+    change, then one completed or failed event carrying the full job
+    """
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        last_stage = None
+        while True:
+            changed = job_queue.watch(job_id)
+            # Finished jobs and disconnected clients must not leave the watch behind
+            try:
+                job = await job_queue.get(job_id)
+                if job is None:
+                    yield f"event: failed\ndata: {json.dumps({'job_id': job_id, 'error': 'Job expired'})}\n\n"
+                    return
+                job.pop("payload")
+                if job["status"] in (COMPLETED, FAILED):
+                    yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                    return
+                if (job["status"], job["stage"]) != last_stage:
+                    last_stage = (job["status"], job["stage"])
+                    yield f"event: progress\ndata: {json.dumps({'job_id': job_id, 'status': job['status'], 'stage': job['stage'], 'progress': job['progress']})}\n\n"
+                try:
+                    await asyncio.wait_for(changed.wait(), JOB_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+            finally:
+                job_queue.unwatch(job_id, changed)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/chat")
 async def chat_with_ai(request: ChatRequest):
     """AI Chatbot endpoint for medical questions and conversations"""
@@ -194,7 +664,7 @@ async def chat_with_ai(request: ChatRequest):
         
         logger.info(f"Processing chat message: {request.message[:50]}...")
         
-        chat_response = chat_with_medical_ai(request.message, request.context)
+        chat_response = await chat_with_medical_ai_async(request.message, compact_chat_context(request.context), request.conversation_id)
         
         return JSONResponse(content={
             "success": True,
@@ -208,6 +678,28 @@ async def chat_with_ai(request: ChatRequest):
         logger.error(f"Error in chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
+@app.post("/chat/stream")
+async def stream_chat_with_ai(request: ChatRequest):
+    """Stream the AI chat reply as Server-Sent Events: token events, then a done event with metadata"""
+    if not os.getenv('OPENAI_API_KEY') and not os.getenv('ANTHROPIC_API_KEY'):
+        raise HTTPException(
+            status_code=503, 
+            detail="AI Chat service unavailable. Please configure API keys."
+        )
+    
+    logger.info(f"Streaming chat message: {request.message[:50]}...")
+    
+    async def event_stream():
+        async for event in stream_chat_with_medical_ai(request.message, compact_chat_context(request.context), request.conversation_id):
+            event_type = event.pop("type")
+            yield f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/health-insights")
 async def generate_health_insights(request: HealthInsightsRequest):
     """Generate additional health insights based on analysis data"""
@@ -220,13 +712,16 @@ async def generate_health_insights(request: HealthInsightsRequest):
         
         logger.info("Generating health insights")
         
-        insights = get_health_insights(request.analysis_data)
+        context = await load_followup_context(request.analysis_id, request.analysis_data)
+        insights = await get_health_insights_async(context)
         
         return JSONResponse(content={
             "success": True,
             "insights": insights
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating insights: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Insights generation failed: {str(e)}")
@@ -243,13 +738,16 @@ async def create_medical_report(request: MedicalReportRequest):
         
         logger.info("Generating professional medical report")
         
-        report = generate_medical_report(request.analysis_data, request.patient_info)
+        context = await load_followup_context(request.analysis_id, request.analysis_data)
+        report = await generate_medical_report_async(context, request.patient_info)
         
         return JSONResponse(content={
             "success": True,
             "report": report
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating medical report: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Medical report generation failed: {str(e)}")
@@ -306,12 +804,10 @@ async def get_demo_analysis():
         logger.info("Running demo analysis")
         
         # Use LLM analysis if available, otherwise fall back to legacy
-        if os.getenv('OPENAI_API_KEY') or os.getenv('ANTHROPIC_API_KEY'):
-            analysis_result = analyze_medical_document_llm(demo_text)
-        else:
-            analysis_result = legacy_analyzer.analyze_medical_document(demo_text, "demo_medical_report.pdf")
+        use_llm = bool(os.getenv('OPENAI_API_KEY') or os.getenv('ANTHROPIC_API_KEY'))
+        analysis_result, _ = await run_analysis_pipeline(demo_text, "demo_medical_report.pdf", MODE_LLM if use_llm else MODE_RULES)
         
-        return JSONResponse(content={
+        return AnalysisJSONResponse(content={
             "success": True,
             "filename": "demo_medical_report.pdf",
             "analysis": analysis_result
@@ -0,0 +1,203 @@
+# Risk scoring of many documents at once, as NumPy operations over a documents × analytes matrix
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clinical_rules import CONDITIONS, HIGH, LOW, ClinicalRules, clinical_rules
+from lab_panel import PANEL_ANALYTES
+from result_model import Condition, LabValue
+
+logger = logging.getLogger(__name__)
+
+# Columns of the severity counts, in the order of the analyzer's severity_distribution
+SEVERITIES: Tuple[str, ...] = ('critical', 'moderate', 'mild', 'normal')
+
+# Risk points and risk factor text of a detected condition (MedicalTextAnalyzer._condition_risk)
+ConditionRisk = Callable[[Condition], Tuple[int, Optional[str]]]
+
+
+class LabMatrix:
+    """
+    Lab values of N documents as an N × PANEL_ANALYTES float matrix, NaN
+    where a document does not report the analyte; mask marks the values
+    that are present.
+    """
+
+    __slots__ = ('values', 'mask')
+
+    def __init__(self, lab_values_list: Sequence[Dict[str, LabValue]]):
+        columns = {name: column for column, name in enumerate(PANEL_ANALYTES)}
+        self.values = np.full((len(lab_values_list), len(PANEL_ANALYTES)), np.nan)
+        for row, lab_values in enumerate(lab_values_list):
+            for name, result in lab_values.items():
+                column = columns.get(name)
+                if column is not None:
+                    self.values[row, column] = result.value
+        self.mask = ~np.isnan(self.values)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, PANEL_ANALYTES.index(name)]
+
+
+class BatchScores:
+    """Per-document scores of a batch; every attribute is an array with one entry per document"""
+
+    __slots__ = (
+        'labs', 'bands', 'status', 'severity', 'rule_scores',
+        'risk_score', 'risk_percentage', 'overall_risk',
+        'condition_score', 'condition_risk_percentage', 'condition_risk'
+    )
+
+    def __len__(self) -> int:
+        return len(self.labs)
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """The scores of each document as a plain dict, in document order"""
+        for row in range(len(self)):
+            yield {
+                'risk_score': int(self.risk_score[row]),
+                'risk_percentage': int(self.risk_percentage[row]),
+                'overall_risk': str(self.overall_risk[row]),
+                'condition_risk_score': int(self.condition_score[row]),
+                'condition_risk_percentage': int(self.condition_risk_percentage[row]),
+                'condition_risk': str(self.condition_risk[row]),
+                'rule_scores': {name: int(scores[row]) for name, scores in self.rule_scores.items()}
+            }
+
+
+def dynamic_risk_percentage(overall_score: np.ndarray, severity_counts: np.ndarray, total_findings: np.ndarray) -> np.ndarray:
+    """MedicalTextAnalyzer._calculate_dynamic_risk_percentage over arrays; severity_counts columns follow SEVERITIES"""
+    base = np.minimum(overall_score * 7, 100)
+    severity_adjustment = severity_counts[:, 0] * 25 + severity_counts[:, 1] * 10 + severity_counts[:, 2] * 3
+    finding_adjustment = np.where(total_findings > 5, np.minimum((total_findings - 5) * 2, 15), 0)
+    final = base + severity_adjustment + finding_adjustment
+    final = np.where(final < 5, np.maximum(5, overall_score * 3), final)
+    return np.minimum(final, 95)
+
+
+def legacy_risk_percentage(risk_score: np.ndarray, condition_count: np.ndarray, risk_factor_count: np.ndarray) -> np.ndarray:
+    """MedicalTextAnalyzer._calculate_legacy_risk_percentage over arrays"""
+    final = np.minimum(risk_score * 8, 80) + np.minimum(condition_count * 5, 15) + np.minimum(risk_factor_count * 3, 10)
+    final = np.where(final < 10, np.maximum(10, risk_score * 5), final)
+    return np.minimum(final, 90)
+
+
+class BatchScorer:
+    """
+    The clinical rules compiled to arrays. classify() runs one searchsorted
+    per analyte column, each rule clause becomes a column of one boolean
+    predicate matrix, and rule, risk and condition scores are reductions
+    over it, so the cost per document is a handful of vector operations.
+    """
+
+    def __init__(self, condition_risk: ConditionRisk, rules: ClinicalRules = clinical_rules):
+        self.cutoffs = [np.asarray(rules.cutoffs[name]) for name in PANEL_ANALYTES]
+        # Band index -> status, per analyte, and where a high finding turns critical (ClinicalRules.finding_severity)
+        self.band_status = [np.array([band.status for band in rules.bands[name]], dtype=np.int8) for name in PANEL_ANALYTES]
+        self.finding_critical = np.array([rules.critical_limits[name][0] for name in PANEL_ANALYTES])
+
+        self.predicate_columns = np.array([PANEL_ANALYTES.index(analyte) for analyte, _, _ in rules.predicates], dtype=np.intp)
+        self.predicate_index = np.array([index for _, index, _ in rules.predicates], dtype=np.int16)
+        self.predicate_direction = np.array([direction for _, _, direction in rules.predicates], dtype=np.int16)
+
+        # rule -> combine, [(predicate ids, points) per group]
+        self.rules: Dict[str, Tuple[str, List[Tuple[np.ndarray, np.ndarray]]]] = {}
+        for name, (combine, clauses) in rules.rules.items():
+            groups: Dict[str, Tuple[List[int], List[int]]] = {}
+            for predicate_id, points, group, _ in clauses:
+                ids, group_points = groups.setdefault(group, ([], []))
+                ids.append(predicate_id)
+                group_points.append(points)
+            self.rules[name] = (combine, [(np.array(ids), np.array(points)) for ids, points in groups.values()])
+
+        # condition rule -> (minimum score, risk points, risk factors) tiers, highest first
+        self.conditions: Dict[str, List[Tuple[int, int, int]]] = {}
+        for name, tiers in CONDITIONS.items():
+            self.conditions[name] = []
+            for minimum, condition in tiers:
+                points, factor = condition_risk(Condition(evidence=[], **condition))
+                self.conditions[name].append((minimum, points, int(factor is not None)))
+
+    def classify(self, labs: LabMatrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Band index, status and finding severity column of every value; -1 severity where a value is missing"""
+        bands = np.zeros(labs.values.shape, dtype=np.int16)
+        status = np.zeros(labs.values.shape, dtype=np.int8)
+        for column, cutoffs in enumerate(self.cutoffs):
+            present = labs.mask[:, column]
+            index = np.searchsorted(cutoffs, labs.values[present, column], side='right')
+            bands[present, column] = index
+            status[present, column] = self.band_status[column][index]
+
+        # NaN compares False, so missing values never count as critical
+        critical = labs.values > self.finding_critical
+        severity = np.select(
+            [~labs.mask, status == LOW, (status == HIGH) & critical, status == HIGH],
+            [-1, SEVERITIES.index('mild'), SEVERITIES.index('critical'), SEVERITIES.index('moderate')],
+            SEVERITIES.index('normal')
+        ).astype(np.int8)
+        return bands, status, severity
+
+    def evaluate(self, labs: LabMatrix, bands: np.ndarray) -> Dict[str, np.ndarray]:
+        """Every rule's score for every document"""
+        offsets = (bands[:, self.predicate_columns] - self.predicate_index) * self.predicate_direction
+        met = labs.mask[:, self.predicate_columns] & (offsets >= 0)
+
+        scores = {}
+        for name, (combine, groups) in self.rules.items():
+            # Each group counts once, through its highest-scoring met clause
+            group_points = np.stack([np.max(met[:, ids] * points, axis=1) for ids, points in groups], axis=1)
+            scores[name] = group_points.max(axis=1) if combine == 'max' else group_points.sum(axis=1)
+        return scores
+
+    def score(self, labs: LabMatrix, text_severity_counts: np.ndarray) -> BatchScores:
+        """
+        Risk assessment (_calculate_risk_assessment) and condition risk
+        analysis (_generate_comprehensive_risk_analysis) of every document.
+        text_severity_counts holds each document's text findings per SEVERITIES column.
+        """
+        scores = BatchScores()
+        scores.labs = labs
+        scores.bands, scores.status, scores.severity = self.classify(labs)
+        scores.rule_scores = self.evaluate(labs, scores.bands)
+
+        # Lab findings by severity plus the text findings
+        severity_counts = np.stack([(scores.severity == level).sum(axis=1) for level in range(len(SEVERITIES))], axis=1)
+        severity_counts = severity_counts + text_severity_counts
+        total_findings = severity_counts.sum(axis=1)
+
+        overall_score = scores.rule_scores['cardiovascular_risk'] + scores.rule_scores['diabetes_risk']
+        scores.risk_score = overall_score
+        scores.risk_percentage = dynamic_risk_percentage(overall_score, severity_counts, total_findings)
+        scores.overall_risk = np.select(
+            [
+                (overall_score >= 8) | (severity_counts[:, 0] > 0),
+                (overall_score >= 5) | (severity_counts[:, 1] > 2),
+                (overall_score >= 2) | (severity_counts[:, 2] > 1)
+            ],
+            ['High', 'Moderate', 'Low-Moderate'],
+            'Low'
+        )
+
+        # Detected conditions: the first tier each condition rule reaches
+        condition_score = np.zeros(len(labs), dtype=np.int64)
+        condition_count = np.zeros(len(labs), dtype=np.int64)
+        factor_count = np.zeros(len(labs), dtype=np.int64)
+        for name, tiers in self.conditions.items():
+            rule_score = scores.rule_scores[name]
+            reached = [rule_score >= minimum for minimum, _, _ in tiers]
+            condition_score += np.select(reached, [points for _, points, _ in tiers], 0)
+            factor_count += np.select(reached, [factors for _, _, factors in tiers], 0)
+            condition_count += np.logical_or.reduce(reached)
+        scores.condition_score = condition_score
+        scores.condition_risk_percentage = legacy_risk_percentage(condition_score, condition_count, factor_count)
+        scores.condition_risk = np.select(
+            [condition_score >= 6, condition_score >= 4, condition_score >= 2, condition_score >= 1],
+            ['High', 'Moderate-High', 'Moderate', 'Low-Moderate'],
+            'Low'
+        )
+        logger.info(f"🧮 Scored batch of {len(labs)} documents")
+        return scores
@@ -0,0 +1,354 @@
+# Content-addressed analysis cache and prompt-level LLM response cache
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from result_model import dumps
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+ANALYSIS_CACHE_MEMORY_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", "256"))
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", os.path.join("data", "analysis_cache"))
+ANALYSIS_CACHE_DISK_BYTES = int(os.getenv("ANALYSIS_CACHE_DISK_MB", "512")) * 1024 * 1024
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_HOURS", "168")) * 3600
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-pasted or re-wrapped text hashes identically"""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def sha256_text(text: str) -> str:
+    return sha256_bytes(normalize_text(text).encode("utf-8"))
+
+
+class TTLLRUCache:
+    """Thread-safe in-memory LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """JSON files on local disk with TTL and least-recently-used eviction by total size"""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, list]] = None  # key -> [size, last_used]
+        self._total_bytes = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        """Scan the cache directory once, on first use"""
+        if self._index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            self._index[name[:-5]] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def _remove(self, key: str):
+        size, _ = self._index.pop(key)
+        self._total_bytes -= size
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            self._load_index()
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            path = self._path(key)
+            try:
+                written_at = os.stat(path).st_mtime
+                if written_at + self.ttl_seconds < time.time():
+                    self._remove(key)
+                    return None
+                with open(path, "r", encoding="utf-8") as handle:
+                    value = json.load(handle)
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            entry[1] = time.time()
+            return value
+
+    def set(self, key: str, value: Any):
+        data = dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._remove(key)
+            temp_path = self._path(key) + ".tmp"
+            with open(temp_path, "wb") as handle:
+                handle.write(data)
+            os.replace(temp_path, self._path(key))
+            self._index[key] = [len(data), time.time()]
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                for stale_key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                    self._remove(stale_key)
+                    self.evictions += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_index()
+            return {"entries": len(self._index), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis results keyed on document content hash,
+    analysis mode and model/rules version
+    """
+
+    def __init__(self, enabled: bool = ANALYSIS_CACHE_ENABLED):
+        self.enabled = enabled
+        self.memory = TTLLRUCache(ANALYSIS_CACHE_MEMORY_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS)
+        self.disk = DiskCache(ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_DISK_BYTES, ANALYSIS_CACHE_TTL_SECONDS)
+        self._stats_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def make_key(content_hash: str, mode: str, version: str) -> str:
+        return sha256_bytes(f"{content_hash}|{mode}|{version}".encode("utf-8"))
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up memory first, then disk (promoting disk hits into memory)"""
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+            self._count("disk_hits")
+            return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        try:
+            self.disk.set(key, value)
+        except OSError as e:
+            logger.warning(f"⚠️ Analysis cache disk write failed: {e}")
+        self._count("stores")
+
+    def status(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        return {
+            "enabled": self.enabled,
+            **stats,
+            "hit_rate": round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0,
+            "memory": {"entries": len(self.memory), "max_entries": self.memory.max_entries, "evictions": self.memory.evictions},
+            "disk": {**self.disk.status(), "evictions": self.disk.evictions} if self.enabled else {}
+        }
+
+
+# Global analysis cache shared by the API
+analysis_cache = AnalysisCache()
+
+
+PROMPT_CACHE_BACKEND = os.getenv("PROMPT_CACHE_BACKEND", "memory").lower()  # memory, sqlite or off
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "5000"))
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_HOURS", "24")) * 3600
+PROMPT_CACHE_PATH = os.getenv("PROMPT_CACHE_PATH", os.path.join("data", "prompt_cache.sqlite3"))
+
+_SENTENCE_PUNCTUATION = re.compile(r'[?!.,;:]+(?=\s|$)')
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Case-, whitespace- and sentence-punctuation-insensitive form of a prompt,
+    so near-identical questions share an entry. Decimals such as 6.5 are kept.
+    """
+    return _SENTENCE_PUNCTUATION.sub('', normalize_text(text).lower())
+
+
+class SQLiteResponseStore:
+    """Prompt cache backend persisted in a local SQLite file, with TTL and LRU eviction"""
+
+    def __init__(self, db_path: str, max_entries: int, ttl_seconds: float):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+                overflow = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class PromptCache:
+    """
+    Cache of LLM completions keyed on the normalized prompt, model and sampling
+    parameters. The backend is any object with get/set/__len__, in memory or SQLite.
+    """
+
+    def __init__(self, backend: Optional[Any], backend_name: str):
+        self.backend = backend
+        self.backend_name = backend_name
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: int, messages: list) -> str:
+        normalized = "\x1e".join(f"{message['role']}:{normalize_prompt(message['content'])}" for message in messages)
+        return sha256_bytes(f"{model}|{temperature}|{max_tokens}|{normalized}".encode("utf-8"))
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        value = self.backend.get(key)
+        with self._stats_lock:
+            self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        self.backend.set(key, value)
+        with self._stats_lock:
+            self.stats["stores"] += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        status = {"backend": self.backend_name, **stats, "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0}
+        if self.enabled:
+            status.update({"entries": len(self.backend), "evictions": self.backend.evictions})
+        return status
+
+
+def create_prompt_cache(backend_name: str = PROMPT_CACHE_BACKEND) -> PromptCache:
+    """Build the prompt cache for the configured backend"""
+    if backend_name == "sqlite":
+        backend = SQLiteResponseStore(PROMPT_CACHE_PATH, PROMPT_CACHE_MAX_ENTRIES, PROMPT_CACHE_TTL_SECONDS)
+    elif backend_name == "memory":
+        backend = TTLLRUCache(PROMPT_CACHE_MAX_ENTRIES, PROMPT_CACHE_TTL_SECONDS)
+    else:
+        backend, backend_name = None, "off"
+    logger.info(f"🗃️ Prompt cache backend: {backend_name}")
+    return PromptCache(backend, backend_name)
+
+
+# Global prompt cache shared by chat and health insights
+prompt_cache = create_prompt_cache()
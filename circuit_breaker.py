@@ -0,0 +1,145 @@
+# Circuit breaker for failing fast when a downstream dependency is degraded
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Outcomes considered when deciding to trip, and how many are needed first
+BREAKER_WINDOW = max(1, int(os.getenv("LLM_BREAKER_WINDOW", "20")))
+BREAKER_MIN_CALLS = max(1, int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")))
+
+# Share of failed (or too slow) calls in the window that opens the circuit
+BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+
+# Calls slower than this count as failures even if they succeed
+BREAKER_SLOW_CALL_MS = float(os.getenv("LLM_BREAKER_SLOW_MS", "20000"))
+
+# Seconds to stay open before letting probe requests through
+BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+
+# Concurrent probe requests allowed while half-open
+BREAKER_HALF_OPEN_PROBES = max(1, int(os.getenv("LLM_BREAKER_PROBES", "1")))
+
+# Breaker states
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls flow and outcomes fill a rolling window; when enough of the
+    window failed or was slow the circuit opens. Open: calls are rejected
+    immediately. After the cool-down the circuit is half-open and a limited
+    number of probe calls decide whether it closes again or re-opens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_call_ms: float = BREAKER_SLOW_CALL_MS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+        self.trips = 0
+        self.short_circuited = 0
+
+    def _current_state(self, now: float) -> str:
+        """State with the open -> half-open timeout applied; caller holds the lock"""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info(f"🟡 {self.name} circuit half-open, probing")
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Whether a call may proceed; every allowed call must end in record_success, record_failure or release"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self, latency_ms: float):
+        if latency_ms > self.slow_call_ms:
+            logger.warning(f"🐢 {self.name} call took {latency_ms:.0f} ms, counting as failure")
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probes_in_flight = 0
+                logger.info(f"🟢 {self.name} circuit closed")
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._trip()
+
+    def release(self):
+        """Give back a probe slot for a call that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self.trips += 1
+        logger.warning(f"🔴 {self.name} circuit opened for {self.open_seconds:.0f}s")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            calls = len(self._outcomes)
+            return {
+                "state": state,
+                "window_calls": calls,
+                "window_failure_rate": round(self._outcomes.count(False) / calls, 2) if calls else 0.0,
+                "retry_in_s": round(max(0.0, self.open_seconds - (now - self._opened_at)), 1) if state == OPEN else None,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited
+            }
@@ -0,0 +1,459 @@
+# Clinical thresholds and rules as data, compiled once into bisect lookups and predicate vectors
+from bisect import bisect_right
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Where a value sits against its reference range
+LOW, NORMAL, HIGH = -1, 0, 1
+
+# analyte -> bands in increasing order as (lower cutoff, category, status label, severity).
+# A value equal to a cutoff belongs to the band starting there; the first band has no lower cutoff.
+# Bands of a NORMAL_SEVERITIES severity make up the reference range. The severity is the one the
+# detailed lab analysis reports for the band; findings and the clinical text grade abnormal
+# values by their distance from the reference range instead (finding_severity, is_critical).
+REFERENCE_BANDS: Dict[str, List[Tuple[Optional[float], str, str, str]]] = {
+    'cholesterol': [
+        (None, 'desirable', 'Normal', 'normal'),
+        (200, 'borderline', 'Borderline High', 'moderate'),
+        (240, 'high', 'High', 'high'),
+    ],
+    'ldl': [
+        (None, 'optimal', 'Normal', 'normal'),
+        (100, 'near_optimal', 'Near Optimal', 'mild'),
+        (130, 'borderline', 'Borderline High', 'moderate'),
+        (160, 'high', 'High', 'high'),
+    ],
+    'hdl': [
+        (None, 'low', 'Low', 'moderate'),
+        (40, 'normal', 'Normal', 'normal'),
+        (60, 'protective', 'High (Protective)', 'optimal'),
+    ],
+    'triglycerides': [
+        (None, 'normal', 'Normal', 'normal'),
+        (150, 'borderline', 'Borderline High', 'moderate'),
+        (200, 'high', 'High', 'moderate'),
+    ],
+    'glucose': [
+        (None, 'low', 'Low', 'mild'),
+        (70, 'normal', 'Normal', 'normal'),
+        (100, 'prediabetes', 'Prediabetic Range', 'moderate'),
+        (126, 'diabetes', 'Diabetic Range', 'high'),
+    ],
+    'hba1c': [
+        (None, 'normal', 'Normal', 'normal'),
+        (5.7, 'prediabetes', 'Prediabetic Range', 'moderate'),
+        (6.5, 'diabetes', 'Diabetic Range', 'high'),
+    ],
+    'blood_pressure_systolic': [
+        (None, 'low', 'Low', 'mild'),
+        (90, 'normal', 'Normal', 'normal'),
+        (120, 'elevated', 'Elevated', 'mild'),
+        (130, 'stage1', 'Stage 1 Hypertension', 'moderate'),
+        (140, 'stage2', 'Stage 2 Hypertension', 'high'),
+        (180, 'crisis', 'Hypertensive Crisis', 'critical'),
+    ],
+    # "Elevated" is defined by systolic pressure alone; diastolic goes straight from normal to stage 1
+    'blood_pressure_diastolic': [
+        (None, 'low', 'Low', 'mild'),
+        (60, 'normal', 'Normal', 'normal'),
+        (80, 'stage1', 'Stage 1 Hypertension', 'moderate'),
+        (90, 'stage2', 'Stage 2 Hypertension', 'moderate'),
+        (120, 'crisis', 'Hypertensive Crisis', 'critical'),
+    ],
+    'hemoglobin': [
+        (None, 'anemia', 'Low', 'mild'),
+        (12, 'normal', 'Normal', 'normal'),
+        (16, 'high', 'High', 'moderate'),
+    ],
+    'white_blood_cells': [
+        (None, 'low', 'Low', 'mild'),
+        (4000, 'normal', 'Normal', 'normal'),
+        (11000, 'high', 'High', 'moderate'),
+    ],
+    'platelets': [
+        (None, 'low', 'Low', 'mild'),
+        (150000, 'normal', 'Normal', 'normal'),
+        (450000, 'high', 'High', 'moderate'),
+    ],
+    'creatinine': [
+        (None, 'low', 'Low', 'mild'),
+        (0.6, 'normal', 'Normal', 'normal'),
+        (1.2, 'elevated', 'Elevated', 'moderate'),
+        (1.5, 'high', 'High', 'moderate'),
+    ],
+    'bun': [
+        (None, 'low', 'Low', 'mild'),
+        (7, 'normal', 'Normal', 'normal'),
+        (20, 'elevated', 'Elevated', 'moderate'),
+        (30, 'high', 'High', 'moderate'),
+    ],
+    'alt': [
+        (None, 'low', 'Low', 'mild'),
+        (7, 'normal', 'Normal', 'normal'),
+        (56, 'elevated', 'Elevated', 'moderate'),
+        (100, 'high', 'High', 'moderate'),
+    ],
+    'ast': [
+        (None, 'low', 'Low', 'mild'),
+        (10, 'normal', 'Normal', 'normal'),
+        (40, 'elevated', 'Elevated', 'moderate'),
+        (80, 'high', 'High', 'moderate'),
+    ],
+    'bilirubin': [
+        (None, 'low', 'Low', 'mild'),
+        (0.2, 'normal', 'Normal', 'normal'),
+        (1.2, 'elevated', 'Elevated', 'moderate'),
+        (2.0, 'high', 'High', 'moderate'),
+    ],
+    'tsh': [
+        (None, 'low', 'Low', 'mild'),
+        (0.4, 'normal', 'Normal', 'normal'),
+        (4.0, 'high', 'High', 'moderate'),
+    ],
+    'vitamin_d': [
+        (None, 'deficient', 'Deficient', 'mild'),
+        (20, 'insufficient', 'Insufficient', 'mild'),
+        (30, 'normal', 'Normal', 'normal'),
+        (100, 'high', 'High', 'moderate'),
+    ],
+    'psa': [
+        (None, 'normal', 'Normal', 'normal'),
+        (4.0, 'elevated', 'Elevated', 'moderate'),
+        (10.0, 'high', 'High', 'moderate'),
+    ],
+}
+
+# Band severities inside the reference range
+NORMAL_SEVERITIES = ('normal', 'optimal')
+
+# A finding above its reference range is 'critical' past this multiple of the upper limit, else 'moderate';
+# one below it is 'mild'
+FINDING_CRITICAL_ABOVE = 1.2
+# The clinical text lists a value under CRITICAL VALUES past these multiples of the reference limits
+CRITICAL_ABOVE, CRITICAL_BELOW = 1.5, 0.5
+
+# (analyte, category) -> (explanation, clinical significance); {value} is the reported value.
+# Bands without an entry get a generic explanation from their status.
+INTERPRETATIONS: Dict[Tuple[str, str], Tuple[str, str]] = {
+    ('glucose', 'diabetes'): (
+        'Fasting glucose of {value} mg/dL indicates diabetes (≥126 mg/dL)',
+        'This level strongly suggests diabetes mellitus. Immediate medical attention and diabetes management are required.'),
+    ('glucose', 'prediabetes'): (
+        'Fasting glucose of {value} mg/dL indicates prediabetes (100-125 mg/dL)',
+        'This level indicates impaired glucose tolerance, which is a precursor to diabetes. Lifestyle changes can help prevent progression.'),
+    ('glucose', 'normal'): (
+        'Fasting glucose of {value} mg/dL is within normal range (70-99 mg/dL)',
+        'Glucose metabolism appears normal. Continue healthy lifestyle habits.'),
+    ('hba1c', 'diabetes'): (
+        'HbA1c of {value}% indicates diabetes (≥6.5%)',
+        'This reflects average blood sugar over 2-3 months and confirms diabetes diagnosis.'),
+    ('hba1c', 'prediabetes'): (
+        'HbA1c of {value}% indicates prediabetes (5.7-6.4%)',
+        'This indicates increased risk for developing diabetes within 5 years.'),
+    ('hba1c', 'normal'): (
+        'HbA1c of {value}% is optimal (<5.7%)',
+        'Excellent long-term glucose control.'),
+    ('cholesterol', 'high'): (
+        'Total cholesterol of {value} mg/dL is high (≥240 mg/dL)',
+        'Significantly increases risk of heart disease and stroke. Medical intervention likely needed.'),
+    ('cholesterol', 'borderline'): (
+        'Total cholesterol of {value} mg/dL is borderline high (200-239 mg/dL)',
+        'Moderate cardiovascular risk. Dietary changes and monitoring recommended.'),
+    ('cholesterol', 'desirable'): (
+        'Total cholesterol of {value} mg/dL is desirable (<200 mg/dL)',
+        'Good cardiovascular risk profile regarding cholesterol.'),
+    ('ldl', 'high'): (
+        'LDL cholesterol of {value} mg/dL is high (≥160 mg/dL)',
+        '"Bad" cholesterol is significantly elevated, substantially increasing heart disease risk.'),
+    ('ldl', 'borderline'): (
+        'LDL cholesterol of {value} mg/dL is borderline high (130-159 mg/dL)',
+        'Moderately elevated "bad" cholesterol requires attention to prevent cardiovascular disease.'),
+    ('ldl', 'near_optimal'): (
+        'LDL cholesterol of {value} mg/dL is near optimal (100-129 mg/dL)',
+        'Slightly elevated but manageable with lifestyle modifications.'),
+    ('ldl', 'optimal'): (
+        'LDL cholesterol of {value} mg/dL is optimal (<100 mg/dL)',
+        'Excellent "bad" cholesterol level, protective against heart disease.'),
+    ('hdl', 'low'): (
+        'HDL cholesterol of {value} mg/dL is low (<40 mg/dL for men, <50 mg/dL for women)',
+        '"Good" cholesterol is too low, reducing protection against heart disease.'),
+    ('hdl', 'protective'): (
+        'HDL cholesterol of {value} mg/dL is high (≥60 mg/dL)',
+        'Excellent "good" cholesterol level, strongly protective against heart disease.'),
+    ('hdl', 'normal'): (
+        'HDL cholesterol of {value} mg/dL is acceptable',
+        'Adequate "good" cholesterol level.'),
+    ('blood_pressure_systolic', 'crisis'): (
+        'Systolic BP of {value} mmHg is in the hypertensive crisis range (≥180 mmHg)',
+        'Blood pressure this high can damage organs. Seek medical care immediately, especially with symptoms.'),
+    ('blood_pressure_systolic', 'stage2'): (
+        'Systolic BP of {value} mmHg indicates Stage 2 hypertension (≥140 mmHg)',
+        'High blood pressure significantly increases risk of heart attack, stroke, and kidney disease. Medication likely needed.'),
+    ('blood_pressure_systolic', 'stage1'): (
+        'Systolic BP of {value} mmHg indicates Stage 1 hypertension (130-139 mmHg)',
+        'Elevated blood pressure increases cardiovascular risk. Lifestyle changes and possible medication needed.'),
+    ('blood_pressure_systolic', 'elevated'): (
+        'Systolic BP of {value} mmHg is elevated (120-129 mmHg)',
+        'Blood pressure is higher than optimal. Lifestyle modifications can help prevent progression to hypertension.'),
+    ('blood_pressure_systolic', 'normal'): (
+        'Systolic BP of {value} mmHg is normal (<120 mmHg)',
+        'Excellent blood pressure reading, protective against cardiovascular disease.'),
+    ('blood_pressure_diastolic', 'crisis'): (
+        'Diastolic BP of {value} mmHg is in the hypertensive crisis range (≥120 mmHg)',
+        'Blood pressure this high can damage organs. Seek medical care immediately, especially with symptoms.'),
+    ('blood_pressure_diastolic', 'stage2'): (
+        'Diastolic BP of {value} mmHg indicates Stage 2 hypertension (≥90 mmHg)',
+        'High blood pressure significantly increases risk of heart attack, stroke, and kidney disease. Medication likely needed.'),
+    ('blood_pressure_diastolic', 'stage1'): (
+        'Diastolic BP of {value} mmHg indicates Stage 1 hypertension (80-89 mmHg)',
+        'Elevated blood pressure increases cardiovascular risk. Lifestyle changes and possible medication needed.'),
+}
+
+
+class Clause(NamedTuple):
+    """Met when the analyte is in this band or one further from normal"""
+    analyte: str
+    category: str
+    points: int = 1
+    # Evidence or risk-factor text for the clause; {value} is the reported value
+    note: str = ""
+    # Clauses of one group count once, through the highest-scoring met clause (default: per analyte)
+    group: Optional[str] = None
+
+
+class Rule(NamedTuple):
+    clauses: Tuple[Clause, ...]
+    # 'sum' adds up the groups' points, 'max' takes the highest
+    combine: str = 'sum'
+
+
+RULES: Dict[str, Rule] = {
+    # Condition detection
+    'diabetes': Rule((
+        Clause('glucose', 'prediabetes', 1, "Fasting glucose {value} mg/dL (prediabetic range)"),
+        Clause('glucose', 'diabetes', 2, "Fasting glucose {value} mg/dL (diabetic range)"),
+        Clause('hba1c', 'prediabetes', 1, "HbA1c {value}% (prediabetic range)"),
+        Clause('hba1c', 'diabetes', 2, "HbA1c {value}% (diabetic range)"),
+    ), combine='max'),
+    'cardiovascular': Rule((
+        Clause('blood_pressure_systolic', 'stage1', 1, "Systolic BP {value} mmHg"),
+        Clause('cholesterol', 'borderline', 1, "Total cholesterol {value} mg/dL"),
+        Clause('ldl', 'borderline', 1, "LDL cholesterol {value} mg/dL"),
+        Clause('hdl', 'low', 1, "HDL cholesterol {value} mg/dL (low)"),
+    )),
+    'kidney': Rule((
+        Clause('creatinine', 'elevated', 1, "Creatinine {value} mg/dL (mildly elevated)"),
+        Clause('creatinine', 'high', 2, "Creatinine {value} mg/dL (elevated)"),
+        Clause('bun', 'high', 1, "BUN {value} mg/dL (elevated)"),
+    )),
+    # Risk scores
+    'cardiovascular_risk': Rule((
+        Clause('cholesterol', 'borderline', 2, "Borderline high cholesterol"),
+        Clause('cholesterol', 'high', 3, "High total cholesterol"),
+        Clause('ldl', 'borderline', 2, "Borderline high LDL"),
+        Clause('ldl', 'high', 3, "High LDL cholesterol"),
+        Clause('hdl', 'low', 2, "Low HDL cholesterol"),
+        Clause('blood_pressure_systolic', 'stage2', 3, "High blood pressure", group='blood_pressure'),
+        Clause('blood_pressure_diastolic', 'stage2', 3, "High blood pressure", group='blood_pressure'),
+    )),
+    'diabetes_risk': Rule((
+        Clause('glucose', 'prediabetes', 2, "Prediabetic glucose"),
+        Clause('glucose', 'diabetes', 4, "Diabetic range glucose"),
+        Clause('hba1c', 'prediabetes', 2, "Prediabetic HbA1c"),
+        Clause('hba1c', 'diabetes', 4, "Diabetic range HbA1c"),
+    )),
+    # Clinical patterns
+    'metabolic_syndrome': Rule((
+        Clause('glucose', 'prediabetes'),
+        Clause('triglycerides', 'borderline'),
+        Clause('hdl', 'low'),
+        Clause('blood_pressure_systolic', 'stage1'),
+    )),
+    'lipid_profile': Rule((
+        Clause('cholesterol', 'borderline'),
+        Clause('ldl', 'borderline'),
+        Clause('hdl', 'low'),
+    )),
+    'aspirin_prevention': Rule((
+        Clause('cholesterol', 'borderline'),
+        Clause('glucose', 'prediabetes'),
+        Clause('blood_pressure_systolic', 'stage1'),
+    )),
+}
+
+# Rule -> (minimum score, condition) tiers, highest first; the first tier reached is reported
+CONDITIONS: Dict[str, Tuple[Tuple[int, Dict[str, str]], ...]] = {
+    'diabetes': (
+        (2, {
+            'name': 'Diabetes Mellitus',
+            'confidence': 'High',
+            'explanation': 'Lab values indicate diabetes. This is a chronic condition requiring ongoing medical management.',
+            'complications_risk': 'High risk for cardiovascular disease, kidney disease, nerve damage, and eye problems if not well controlled.',
+            'management': 'Requires comprehensive diabetes management including medication, diet modification, regular monitoring, and lifestyle changes.'
+        }),
+        (1, {
+            'name': 'Prediabetes',
+            'confidence': 'Moderate',
+            'explanation': 'Lab values suggest impaired glucose metabolism. This is a reversible condition with proper intervention.',
+            'complications_risk': 'Increased risk of developing Type 2 diabetes within 5-10 years without intervention.',
+            'management': 'Lifestyle modifications including weight loss, increased physical activity, and dietary changes can prevent progression to diabetes.'
+        }),
+    ),
+    'cardiovascular': (
+        (2, {
+            'name': 'Cardiovascular Risk Factors',
+            'confidence': 'High',
+            'explanation': 'Multiple cardiovascular risk factors are present, significantly increasing the risk of heart disease and stroke.',
+            'complications_risk': 'High risk for heart attack, stroke, peripheral artery disease, and other cardiovascular events.',
+            'management': 'Requires aggressive risk factor modification including medication management, lifestyle changes, and regular monitoring.'
+        }),
+        (1, {
+            'name': 'Mild Cardiovascular Risk',
+            'confidence': 'Moderate',
+            'explanation': 'Some cardiovascular risk factors are present that should be addressed.',
+            'complications_risk': 'Moderately increased risk for cardiovascular events.',
+            'management': 'Lifestyle modifications and possibly medication to reduce cardiovascular risk.'
+        }),
+    ),
+    'kidney': (
+        (2, {
+            'name': 'Possible Kidney Disease',
+            'confidence': 'Moderate',
+            'explanation': 'Lab values suggest possible kidney function impairment requiring further evaluation.',
+            'complications_risk': 'Progressive kidney disease can lead to chronic kidney disease and eventual need for dialysis.',
+            'management': 'Requires nephrology evaluation, monitoring of kidney function, and management of underlying causes.'
+        }),
+    ),
+}
+
+
+class Band(NamedTuple):
+    category: str
+    label: str
+    severity: str
+    status: int
+    index: int
+
+
+class RuleResult(NamedTuple):
+    score: int
+    # Notes of the met clauses, one per group, in clause order
+    notes: List[str]
+
+
+def _format_cutoff(value: float) -> str:
+    return f"{value:g}"
+
+
+class ClinicalRules:
+    """
+    REFERENCE_BANDS and RULES compiled once. classify() is a bisect over an
+    analyte's sorted cutoffs; evaluate() computes every rule clause as one
+    boolean vector and scores all rules from it, so adding an analyte or a
+    rule is a change to the tables above.
+    """
+
+    def __init__(self, reference_bands=REFERENCE_BANDS, rules=RULES):
+        self.cutoffs: Dict[str, List[float]] = {}
+        self.bands: Dict[str, List[Band]] = {}
+        self.categories: Dict[str, Dict[str, Band]] = {}
+        self.references: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        for analyte, table in reference_bands.items():
+            normal = [index for index, (_, _, _, severity) in enumerate(table) if severity in NORMAL_SEVERITIES]
+            first_normal, last_normal = normal[0], normal[-1]
+            self.cutoffs[analyte] = [float(cutoff) for cutoff, _, _, _ in table[1:]]
+            self.bands[analyte] = [
+                Band(category, label, severity,
+                     NORMAL if severity in NORMAL_SEVERITIES else LOW if index < first_normal else HIGH,
+                     index)
+                for index, (_, category, label, severity) in enumerate(table)
+            ]
+            self.categories[analyte] = {band.category: band for band in self.bands[analyte]}
+            upper = table[last_normal + 1][0] if last_normal + 1 < len(table) else None
+            self.references[analyte] = (table[first_normal][0], upper)
+
+        # Distance-from-range grading as plain cutoffs: (finding critical above, critical above, critical below)
+        self.critical_limits: Dict[str, Tuple[float, float, float]] = {}
+        for analyte, (lower, upper) in self.references.items():
+            upper = float('inf') if upper is None else upper
+            lower = 0.0 if lower is None else lower
+            self.critical_limits[analyte] = (
+                upper * FINDING_CRITICAL_ABOVE, upper * CRITICAL_ABOVE, lower * CRITICAL_BELOW
+            )
+
+        # Every clause of every rule, as (analyte, band index, direction) rows of the predicate vector
+        self.predicates: List[Tuple[str, int, int]] = []
+        predicate_ids: Dict[Tuple[str, str], int] = {}
+        self.rules: Dict[str, Tuple[str, List[Tuple[int, int, str, str]]]] = {}
+        for name, rule in rules.items():
+            compiled = []
+            for clause in rule.clauses:
+                key = (clause.analyte, clause.category)
+                if key not in predicate_ids:
+                    predicate_ids[key] = len(self.predicates)
+                    self.predicates.append(self.predicate(*key))
+                compiled.append((predicate_ids[key], clause.points, clause.group or clause.analyte, clause.note))
+            self.rules[name] = (rule.combine, compiled)
+
+    def predicate(self, analyte: str, category: str) -> Tuple[str, int, int]:
+        """(analyte, band index, direction): bands below normal are met at or below, others at or above"""
+        band = self.categories[analyte].get(category)
+        if band is None:
+            raise ValueError(f"Unknown band {category!r} for {analyte}")
+        return analyte, band.index, -1 if band.status == LOW else 1
+
+    def classify(self, analyte: str, value: float) -> Band:
+        return self.bands[analyte][bisect_right(self.cutoffs[analyte], value)]
+
+    def finding_severity(self, analyte: str, value: float, band: Band) -> str:
+        """Severity of a lab finding: mild below range, moderate above it, critical well above it"""
+        if band.status == LOW:
+            return 'mild'
+        if band.status == HIGH:
+            return 'critical' if value > self.critical_limits[analyte][0] else 'moderate'
+        return 'normal'
+
+    def is_critical(self, analyte: str, value: float) -> bool:
+        """Whether a value is far enough outside its reference range to flag as a critical value"""
+        _, above, below = self.critical_limits[analyte]
+        return value > above or value < below
+
+    def reference(self, analyte: str, units: str) -> str:
+        """Reference range text, e.g. "70-100 mg/dL", "<200 mg/dL" or "≥40 mg/dL\""""
+        lower, upper = self.references[analyte]
+        if lower is None:
+            text = f"<{_format_cutoff(upper)}"
+        elif upper is None:
+            text = f"≥{_format_cutoff(lower)}"
+        else:
+            text = f"{_format_cutoff(lower)}-{_format_cutoff(upper)}"
+        return f"{text} {units}"
+
+    def evaluate(self, bands: Dict[str, Band], values: Dict[str, float]) -> Dict[str, RuleResult]:
+        """Score every rule for one panel of classified values"""
+        vector = []
+        for analyte, index, direction in self.predicates:
+            band = bands.get(analyte)
+            vector.append(band is not None and (band.index - index) * direction >= 0)
+
+        results = {}
+        for name, (combine, clauses) in self.rules.items():
+            best: Dict[str, Tuple[int, str, str]] = {}
+            for predicate_id, points, group, note in clauses:
+                if vector[predicate_id] and points > best.get(group, (0,))[0]:
+                    best[group] = (points, note, self.predicates[predicate_id][0])
+            group_points = [points for points, _, _ in best.values()]
+            score = (max(group_points) if combine == 'max' else sum(group_points)) if group_points else 0
+            notes = [note.format(value=values[analyte]) for _, note, analyte in best.values() if note]
+            results[name] = RuleResult(score, notes)
+        return results
+
+    def condition(self, rule: str, score: int) -> Optional[Dict[str, Any]]:
+        """The condition tier a rule's score reaches, if any"""
+        for minimum, condition in CONDITIONS.get(rule, ()):
+            if score >= minimum:
+                return condition
+        return None
+
+
+# Global rule set, compiled once at import
+clinical_rules = ClinicalRules()
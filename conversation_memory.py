@@ -0,0 +1,119 @@
+# Bounded per-conversation chat memory: recent turns verbatim, older turns as a rolling summary
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from caching import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Recent exchanges (question + reply) sent verbatim with every chat turn
+CHAT_MEMORY_TURNS = max(2, int(os.getenv("CHAT_MEMORY_TURNS", "6")))
+
+# Upper bound on the rolling summary of older exchanges
+CHAT_SUMMARY_MAX_CHARS = max(200, int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "1200")))
+
+# Conversations kept in memory, and how long an idle one survives
+CHAT_MEMORY_MAX_CONVERSATIONS = int(os.getenv("CHAT_MEMORY_MAX_CONVERSATIONS", "1000"))
+CHAT_MEMORY_TTL_SECONDS = float(os.getenv("CHAT_MEMORY_TTL_MINUTES", "60")) * 60
+
+# Client-supplied context (e.g. the analysis being discussed) included with each question
+CHAT_CONTEXT_MAX_CHARS = max(200, int(os.getenv("CHAT_CONTEXT_MAX_CHARS", "2000")))
+
+Turn = Tuple[str, str]
+
+
+def clip_summary(summary: str, max_chars: int = CHAT_SUMMARY_MAX_CHARS) -> str:
+    """Keep the most recent part of a summary that outgrew its budget"""
+    if len(summary) <= max_chars:
+        return summary
+    return "..." + summary[-(max_chars - 3):].split(" ", 1)[-1]
+
+
+def extractive_summary(summary: str, turns: List[Turn]) -> str:
+    """Summary used when the model cannot summarize: the gist of each exchange, newest kept"""
+    lines = [summary] if summary else []
+    for question, reply in turns:
+        lines.append(f"User asked: {question[:150]}. Assistant: {reply.split('. ', 1)[0][:150]}.")
+    return clip_summary(" ".join(lines))
+
+
+class Conversation:
+    """One chat's rolling summary and its most recent turns"""
+
+    def __init__(self, conversation_id: str, window: int = CHAT_MEMORY_TURNS):
+        self.id = conversation_id
+        self.summary = ""
+        self.turns: deque = deque()
+        self.window = window
+        self.lock = threading.Lock()
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        """Chat messages carrying the summary and recent turns, oldest first"""
+        with self.lock:
+            messages = []
+            if self.summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+            for question, reply in self.turns:
+                messages.append({"role": "user", "content": question})
+                messages.append({"role": "assistant", "content": reply})
+            return messages
+
+    def add_turn(self, question: str, reply: str) -> List[Turn]:
+        """
+        Record an exchange. Once the window overflows, the older half is
+        removed and returned so the caller can fold it into the summary;
+        summarizing in batches keeps summary calls rare.
+        """
+        with self.lock:
+            self.turns.append((question, reply))
+            if len(self.turns) <= self.window:
+                return []
+            return [self.turns.popleft() for _ in range(max(1, self.window // 2))]
+
+    def set_summary(self, summary: str):
+        with self.lock:
+            self.summary = clip_summary(summary)
+
+    def replace_summary(self, expected: str, summary: str) -> bool:
+        """Set the summary only if it is still `expected`, i.e. no later fold replaced it meanwhile"""
+        with self.lock:
+            if self.summary != expected:
+                return False
+            self.summary = clip_summary(summary)
+            return True
+
+
+class ConversationMemory:
+    """Conversations by id, evicted when idle (TTL) or least recently used"""
+
+    def __init__(self, max_conversations: int = CHAT_MEMORY_MAX_CONVERSATIONS, ttl_seconds: float = CHAT_MEMORY_TTL_SECONDS):
+        self._conversations = TTLLRUCache(max_conversations, ttl_seconds)
+        self.summaries = 0
+
+    def open(self, conversation_id: Optional[str] = None) -> Conversation:
+        """The stored conversation for this id, or a new one under a fresh id"""
+        if conversation_id:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None:
+                return conversation
+        conversation = Conversation(uuid.uuid4().hex)
+        self._conversations.set(conversation.id, conversation)
+        return conversation
+
+    def save(self, conversation: Conversation):
+        """Mark a conversation as active again, restarting its idle timeout"""
+        self._conversations.set(conversation.id, conversation)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "conversations": len(self._conversations),
+            "max_conversations": self._conversations.max_entries,
+            "evictions": self._conversations.evictions,
+            "window_turns": CHAT_MEMORY_TURNS,
+            "summary_max_chars": CHAT_SUMMARY_MAX_CHARS,
+            "summaries": self.summaries
+        }
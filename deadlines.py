@@ -0,0 +1,81 @@
+# Per-request deadline budgets shared by every analysis pipeline stage
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Default budget per endpoint, in seconds; clients may ask for a different one
+ENDPOINT_DEADLINES = {
+    "analyze": float(os.getenv("DEADLINE_ANALYZE_SECONDS", "60")),
+    "analyze_text": float(os.getenv("DEADLINE_ANALYZE_TEXT_SECONDS", "45")),
+    "batch_item": float(os.getenv("DEADLINE_BATCH_ITEM_SECONDS", "120")),
+    "job": float(os.getenv("DEADLINE_JOB_SECONDS", "600"))
+}
+
+# Upper bound for client-requested budgets
+DEADLINE_MAX_SECONDS = float(os.getenv("DEADLINE_MAX_SECONDS", "600"))
+
+# Share of the budget each stage leaves for the rule-based analysis that must still run after it
+STAGE_RESERVES = {
+    "extraction": 0.1,
+    "llm": 0.1,
+    "rules": 0.0
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """A pipeline stage ran out of its share of the request budget"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded during {stage}")
+
+
+class Deadline:
+    """Absolute point in time by which a request must answer"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def stage_timeout(self, stage: str) -> float:
+        """Time `stage` may take while keeping the reserve for later stages"""
+        return max(0.0, self.remaining() - self.budget * STAGE_RESERVES.get(stage, 0.0))
+
+    async def run_stage(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """
+        Await a stage within its budget, raising DeadlineExceeded on overrun.
+        Work already handed to a thread or process keeps running to completion
+        in the background; only the request stops waiting for it.
+        """
+        timeout = self.stage_timeout(stage)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ {stage} exceeded its {timeout:.1f}s budget")
+            raise DeadlineExceeded(stage)
+
+    def status(self) -> dict:
+        return {"budget_s": self.budget, "remaining_s": round(self.remaining(), 3)}
+
+
+def resolve_deadline(endpoint: str, requested_ms: Optional[int] = None) -> Deadline:
+    """The client's requested budget (capped), or the endpoint default"""
+    if requested_ms:
+        return Deadline(min(requested_ms / 1000, DEADLINE_MAX_SECONDS))
+    return Deadline(ENDPOINT_DEADLINES[endpoint])
@@ -0,0 +1,58 @@
+# Section-aware splitting of long documents into prompt-sized chunks
+import re
+from typing import List
+
+# Standalone heading lines: "LIPID PANEL", "LABORATORY RESULTS:", "Assessment:"
+SECTION_HEADING = re.compile(
+    r"^[ \t]*(?:[A-Z][A-Z0-9 /&(),\-]{2,60}:?|[A-Z][A-Za-z0-9 /&(),\-]{2,40}:)[ \t]*$",
+    re.MULTILINE
+)
+
+# Progressively finer boundaries used to split a section that is still too long
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+def split_sections(text: str) -> List[str]:
+    """Split text at heading lines; concatenating the sections gives back the text"""
+    starts = sorted({0, *(match.start() for match in SECTION_HEADING.finditer(text))})
+    return [text[start:stop] for start, stop in zip(starts, starts[1:] + [len(text)])]
+
+
+def _pack(pieces: List[str], max_chars: int) -> List[str]:
+    """Greedily merge consecutive pieces while they fit in max_chars"""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_oversized(text: str, max_chars: int, separators=_SEPARATORS) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    for position, separator in enumerate(separators):
+        if separator in text:
+            parts = text.split(separator)
+            parts = [part + separator for part in parts[:-1]] + [parts[-1]]
+            pieces = []
+            for part in parts:
+                pieces.extend(_split_oversized(part, max_chars, separators[position + 1:]))
+            return _pack(pieces, max_chars)
+    return [text[start:start + max_chars] for start in range(0, len(text), max_chars)]
+
+
+def chunk_document(text: str, max_chars: int) -> List[str]:
+    """
+    Split a document into chunks of at most max_chars, breaking on section
+    headings first and only falling back to paragraph, line, sentence and
+    word boundaries inside sections that are too long on their own.
+    """
+    pieces = []
+    for section in split_sections(text):
+        pieces.extend(_split_oversized(section, max_chars))
+    return [chunk.strip() for chunk in _pack(pieces, max_chars) if chunk.strip()]
@@ -0,0 +1,62 @@
+# Shared execution helpers for keeping blocking work off the event loop
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Size of the bounded pool used for PDF parsing and rule-based analysis
+ANALYSIS_WORKERS = max(1, int(os.getenv("ANALYSIS_WORKERS", "8")))
+
+_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="medisure-analysis")
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the shared analysis executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one shared task.
+    The work runs as its own task, so a caller that disconnects or is
+    cancelled never cancels the work other callers are waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run `work()` once per key at a time; returns (result, shared) where shared means another caller did the work"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"🔗 Coalesced duplicate {self.name} request onto in-flight work")
+            return await asyncio.shield(task), True
+
+        self.leaders += 1
+        task = asyncio.ensure_future(work())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), False
+
+    def status(self) -> dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+def executor_status() -> dict:
+    """Report executor sizing for health endpoints"""
+    return {"analysis_workers": ANALYSIS_WORKERS}
+
+
+def shutdown_executor():
+    """Stop the shared executor, waiting for in-flight work to finish"""
+    logger.info("🛑 Shutting down analysis executor")
+    _executor.shutdown(wait=True)
@@ -72,7 +72,8 @@ const AIChatInterface = ({ analysisContext = null, onInsightGenerated = null })
 
       setMessages(prev => [...prev, botMessage]);
       
-      if (response.conversation_id && !conversationId) {
+      // The server starts a new conversation when ours has expired
+      if (response.conversation_id && response.conversation_id !== conversationId) {
         setConversationId(response.conversation_id);
       }
 
@@ -42,6 +42,51 @@ class MediSureAPIService {
     }
   }
 
+  async submitAnalysisJob(file, useLLM = true) {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    try {
+      const response = await this.apiClient.post(`/jobs?use_llm=${useLLM}`, formData, {
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+      });
+
+      return {
+        success: true,
+        jobId: response.data.job_id,
+      };
+    } catch (error) {
+      return {
+        success: false,
+        error: error.response?.data?.detail || error.message,
+      };
+    }
+  }
+
+  async getJob(jobId) {
+    const response = await this.apiClient.get(`/jobs/${jobId}`);
+    return response.data;
+  }
+
+  async waitForJob(jobId, onProgress = null, intervalMs = 1500) {
+    // Poll until the job finishes; each request is short, so the 30s axios timeout never applies to the analysis itself
+    for (;;) {
+      const job = await this.getJob(jobId);
+      if (onProgress) {
+        onProgress(job);
+      }
+      if (job.status === 'completed') {
+        return { success: true, data: job.result };
+      }
+      if (job.status === 'failed') {
+        return { success: false, error: job.error };
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  }
+
   async getDemoAnalysis() {
     try {
       const response = await this.apiClient.get('/demo');
@@ -95,11 +140,73 @@ class MediSureAPIService {
     }
   }
 
+  async streamChatWithAI(message, context = null, conversationId = null, onToken = null) {
+    // axios cannot read a streamed body in the browser, so use fetch and parse SSE frames
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message, context, conversation_id: conversationId }),
+    });
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw new Error(body.detail || 'Chat request failed');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      const frames = buffer.split('\n\n');
+      buffer = frames.pop();
+      for (const frame of frames) {
+        const eventLine = frame.split('\n').find((line) => line.startsWith('event: '));
+        const dataLine = frame.split('\n').find((line) => line.startsWith('data: '));
+        if (!eventLine || !dataLine) {
+          continue;
+        }
+        const event = eventLine.slice(7);
+        const data = JSON.parse(dataLine.slice(6));
+        if (event === 'token' && onToken) {
+          onToken(data.content);
+        } else if (event === 'done') {
+          result = data;
+        } else if (event === 'error') {
+          throw new Error(data.detail || 'Chat stream failed');
+        }
+      }
+    }
+
+    return {
+      success: true,
+      response: result?.response,
+      sources: result?.sources,
+      conversation_id: result?.conversation_id,
+      timestamp: result?.timestamp
+    };
+  }
+
+  // Send the server-side analysis id when we have one; the full analysis otherwise or once it has expired
+  async postFollowUp(path, analysisData, extra = {}) {
+    if (analysisData?.analysis_id) {
+      try {
+        return await this.apiClient.post(path, { analysis_id: analysisData.analysis_id, ...extra });
+      } catch (error) {
+        if (error.response?.status !== 404) throw error;
+      }
+    }
+    return this.apiClient.post(path, { analysis_data: analysisData, ...extra });
+  }
+
   async getHealthInsights(analysisData) {
     try {
-      const response = await this.apiClient.post('/health-insights', {
-        analysis_data: analysisData
-      });
+      const response = await this.postFollowUp('/health-insights', analysisData);
 
       return {
         success: true,
@@ -112,10 +219,7 @@ class MediSureAPIService {
 
   async generateMedicalReport(analysisData, patientInfo = null) {
     try {
-      const response = await this.apiClient.post('/generate-report', {
-        analysis_data: analysisData,
-        patient_info: patientInfo
-      });
+      const response = await this.postFollowUp('/generate-report', analysisData, { patient_info: patientInfo });
 
       return {
         success: true,
@@ -0,0 +1,331 @@
+# Durable SQLite-backed job queue for long-running analyses
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from result_model import dumps_text
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "4")))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+# Uploads for queued jobs live next to the database so they survive restarts
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", os.path.join(os.path.dirname(JOB_DB_PATH) or ".", "job_uploads"))
+
+# Seconds an idle worker sleeps before re-checking the queue without a wake-up signal
+JOB_POLL_INTERVAL = 2.0
+
+# Job lifecycle states
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+# Per-stage progress states
+STAGE_PENDING, STAGE_RUNNING, STAGE_DONE = "pending", "running", "done"
+
+JobHandler = Callable[[Dict[str, Any], Callable[[str], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+def _discard_payload_files(payload: Dict[str, Any]):
+    """Remove a job's spooled upload, if it still exists"""
+    pdf_path = payload.get("pdf_path")
+    if pdf_path:
+        try:
+            os.unlink(pdf_path)
+        except OSError:
+            pass
+
+
+class JobStore:
+    """Thread-safe persistence for job records in a local SQLite file"""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def create(self, kind: str, payload: Dict[str, Any], stages: List[str], status: str = QUEUED) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        progress = {stage: STAGE_PENDING for stage in stages}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, stage, progress, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, status, None, json.dumps(progress), json.dumps(payload), now, now)
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, time.time(), row["id"])
+            )
+        job = self._row_to_job(row)
+        job["status"] = RUNNING
+        return job
+
+    def update_stage(self, job_id: str, stage: str):
+        """Mark `stage` running and every earlier stage done"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            progress = json.loads(row["progress"])
+            for name in progress:
+                if name == stage:
+                    progress[name] = STAGE_RUNNING
+                    break
+                progress[name] = STAGE_DONE
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(progress), time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            progress = json.loads(row["progress"])
+            if error is None:
+                progress = {name: STAGE_DONE for name in progress}
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    FAILED if error is not None else COMPLETED,
+                    json.dumps(progress),
+                    dumps_text(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id
+                )
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def requeue_interrupted(self) -> int:
+        """Return jobs left running by a previous process to the queue"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?", (QUEUED, time.time(), RUNNING)
+            )
+        return cursor.rowcount
+
+    def purge_finished(self, older_than_seconds: float) -> List[Dict[str, Any]]:
+        """Delete finished jobs older than the cutoff and return their payloads for cleanup"""
+        cutoff = time.time() - older_than_seconds
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT payload FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (COMPLETED, FAILED, cutoff)
+            ).fetchall()
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (COMPLETED, FAILED, cutoff)
+            )
+        return [json.loads(row["payload"]) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["total"] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "progress": json.loads(row["progress"]),
+            "payload": json.loads(row["payload"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": datetime.fromtimestamp(row["created_at"]).isoformat(),
+            "updated_at": datetime.fromtimestamp(row["updated_at"]).isoformat()
+        }
+
+
+class JobQueue:
+    """Background workers that drain the job store with a pluggable async handler"""
+
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS):
+        self._store = store
+        self.workers = workers
+        self._handler: Optional[JobHandler] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._started_now: Set[asyncio.Task] = set()
+        self._changed: Dict[str, Set[asyncio.Event]] = {}
+        self._last_purge = 0.0
+
+    @property
+    def store(self) -> JobStore:
+        # Opened lazily so importing the module never touches the filesystem
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    async def start(self, handler: JobHandler):
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        requeued = await asyncio.to_thread(self.store.requeue_interrupted)
+        if requeued:
+            logger.info(f"🔁 Requeued {requeued} interrupted jobs")
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info(f"✅ Job queue started with {self.workers} workers ({self.store.db_path})")
+
+    async def stop(self):
+        tasks = self._tasks + list(self._started_now)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._started_now.clear()
+        # Anything cancelled mid-flight goes back to the queue on the next start
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    async def submit(self, kind: str, payload: Dict[str, Any], stages: List[str]) -> str:
+        job_id = await asyncio.to_thread(self.store.create, kind, payload, stages)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"📨 Queued {kind} job {job_id}")
+        return job_id
+
+    async def start_now(self, kind: str, payload: Dict[str, Any], stages: List[str]) -> str:
+        """
+        Run a job right away instead of waiting for a free worker, for work
+        a client is actively waiting on. The job is stored as running, so it
+        is still requeued and retried if the process stops before it finishes.
+        """
+        if self._handler is None:
+            return await self.submit(kind, payload, stages)
+        job_id = await asyncio.to_thread(self.store.create, kind, payload, stages, RUNNING)
+        job = await asyncio.to_thread(self.store.get, job_id)
+        task = asyncio.create_task(self._run(job))
+        self._started_now.add(task)
+        task.add_done_callback(self._started_now.discard)
+        logger.info(f"🚀 Started {kind} job {job_id}")
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def watch(self, job_id: str) -> asyncio.Event:
+        """
+        Event set the next time the job changes stage or finishes. Take it
+        before reading the job so a change in between is not missed, and
+        always hand it back with unwatch.
+        """
+        event = asyncio.Event()
+        self._changed.setdefault(job_id, set()).add(event)
+        return event
+
+    def unwatch(self, job_id: str, event: asyncio.Event):
+        """Drop a watch that was not (or no longer needs to be) notified"""
+        watchers = self._changed.get(job_id)
+        if watchers is None:
+            return
+        watchers.discard(event)
+        if not watchers:
+            del self._changed[job_id]
+
+    def _notify(self, job_id: str):
+        for event in self._changed.pop(job_id, ()):
+            event.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "started_now": len(self._started_now),
+            "watched": len(self._changed),
+            "jobs": self.store.counts() if self._store is not None else {}
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                await self._purge_if_due()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+
+        async def report_stage(stage: str):
+            await asyncio.to_thread(self.store.update_stage, job_id, stage)
+            self._notify(job_id)
+
+        try:
+            result = await self._handler(job, report_stage)
+            await asyncio.to_thread(self.store.finish, job_id, result)
+            logger.info(f"✅ Job {job_id} completed")
+        except asyncio.CancelledError:
+            # Keep spooled inputs so the requeued job can run after a restart
+            raise
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {str(e)}")
+            await asyncio.to_thread(self.store.finish, job_id, None, str(e))
+        self._notify(job_id)
+        _discard_payload_files(job["payload"])
+
+    async def _purge_if_due(self):
+        if time.time() - self._last_purge < 600:
+            return
+        self._last_purge = time.time()
+        payloads = await asyncio.to_thread(self.store.purge_finished, JOB_RETENTION_HOURS * 3600)
+        for payload in payloads:
+            _discard_payload_files(payload)
+        if payloads:
+            logger.info(f"🧹 Purged {len(payloads)} finished jobs")
+
+
+# Global job queue shared by the API
+job_queue = JobQueue()
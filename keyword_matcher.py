@@ -0,0 +1,136 @@
+# Aho-Corasick matching of every keyword vocabulary in a single pass over the text
+import logging
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    # C implementation of the same automaton; much faster on large documents
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# category -> label -> keywords, e.g. {"report_type": {"imaging": ["mri", "x-ray"]}}
+Vocabularies = Dict[str, Dict[str, Iterable[str]]]
+
+
+class KeywordHit(NamedTuple):
+    """One keyword occurrence; start/end index the lowercased text"""
+    start: int
+    end: int
+    keyword: str
+    category: str
+    label: str
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+class KeywordMatcher:
+    """
+    One automaton built from every vocabulary. find_all walks the text once
+    and reports every occurrence of every keyword, including overlapping
+    ones, so the cost grows with the text rather than with the vocabularies.
+    Categories in whole_word only match whole words ("dm" must not match
+    inside "admission"); the others match as substrings, like `in`.
+    """
+
+    def __init__(self, vocabularies: Vocabularies, whole_word: Iterable[str] = ()):
+        self.whole_word: FrozenSet[str] = frozenset(whole_word)
+        self.outputs: Dict[str, List[Tuple[str, str]]] = {}
+        for category, labels in vocabularies.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    targets = self.outputs.setdefault(keyword.lower(), [])
+                    if (category, label) not in targets:
+                        targets.append((category, label))
+
+        if HAS_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.outputs:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            self._build_dfa()
+        logger.info(f"🔤 Keyword automaton built: {len(self.outputs)} keywords")
+
+    def _build_dfa(self):
+        # Trie, then failure links in breadth-first order, folded into a full transition table
+        goto: List[Dict[str, int]] = [{}]
+        matched: List[List[str]] = [[]]
+        for keyword in self.outputs:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    matched.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            matched[state].append(keyword)
+
+        fail = [0] * len(goto)
+        self._transitions: List[Dict[str, int]] = [dict(goto[0])]
+        self._transitions.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Transitions missing here are inherited from the failure state, which is shallower and already complete
+            self._transitions[state] = {**self._transitions[fail[state]], **goto[state]}
+            matched[state] = matched[state] + matched[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = self._transitions[fail[state]].get(char, 0) if state else 0
+                queue.append(child)
+        self._matched: List[Tuple[str, ...]] = [tuple(keywords) for keywords in matched]
+
+    def _raw_hits(self, text: str) -> Iterable[Tuple[int, str]]:
+        """(end index, keyword) for every occurrence"""
+        if HAS_AHOCORASICK:
+            for last, keyword in self._automaton.iter(text):
+                yield last + 1, keyword
+            return
+        transitions, matched = self._transitions, self._matched
+        state = 0
+        for index, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            if matched[state]:
+                for keyword in matched[state]:
+                    yield index + 1, keyword
+
+    def find_all(self, text: str, categories: Optional[Iterable[str]] = None) -> List[KeywordHit]:
+        """Every keyword hit in text, in order of position, optionally limited to some categories"""
+        wanted = frozenset(categories) if categories is not None else None
+        text = text.lower()
+        hits = []
+        for end, keyword in self._raw_hits(text):
+            start = end - len(keyword)
+            for category, label in self.outputs[keyword]:
+                if wanted is not None and category not in wanted:
+                    continue
+                if category in self.whole_word and not _is_whole_word(text, start, end):
+                    continue
+                hits.append(KeywordHit(start, end, keyword, category, label))
+        hits.sort(key=lambda hit: (hit.start, -hit.end))
+        return hits
+
+
+def first_positions(hits: Iterable[KeywordHit], category: str) -> Dict[str, int]:
+    """Start of the first occurrence of each keyword of a category"""
+    positions: Dict[str, int] = {}
+    for hit in hits:
+        if hit.category == category and hit.keyword not in positions:
+            positions[hit.keyword] = hit.start
+    return positions
+
+
+def labels_found(hits: Iterable[KeywordHit], category: str) -> Dict[str, List[str]]:
+    """Labels of a category that were hit, with their distinct keywords, in order of first appearance"""
+    found: Dict[str, List[str]] = {}
+    for hit in hits:
+        if hit.category == category:
+            keywords = found.setdefault(hit.label, [])
+            if hit.keyword not in keywords:
+                keywords.append(hit.keyword)
+    return found
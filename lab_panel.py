@@ -0,0 +1,65 @@
+# Lab features computed once per document and shared by every analyzer stage
+from typing import Dict, Tuple
+
+from clinical_rules import NORMAL, Band, ClinicalRules, RuleResult, clinical_rules
+from lab_scanner import ANALYTES
+from result_model import LabValue
+
+# Every analyte the scanner reports, blood pressure as its two readings
+PANEL_ANALYTES: Tuple[str, ...] = tuple(analyte.name for analyte in ANALYTES) + (
+    'blood_pressure_systolic', 'blood_pressure_diastolic'
+)
+
+_MISSING = float('nan')
+
+
+class LabPanel:
+    """
+    One document's lab values plus the features the analyzer stages share.
+    Each analyte is an attribute holding its value, or NaN when the document
+    does not report it, so `panel.glucose >= 126` is simply False for a
+    missing value. Every value is classified into its reference band and
+    every clinical rule is scored once here instead of in every stage.
+    """
+
+    __slots__ = PANEL_ANALYTES + ('lab_values', 'bands', 'status', 'rules', 'results')
+
+    def __init__(self, lab_values: Dict[str, LabValue], rules: ClinicalRules = clinical_rules):
+        self.lab_values = lab_values
+        self.rules = rules
+        for name in PANEL_ANALYTES:
+            result = lab_values.get(name)
+            setattr(self, name, _MISSING if result is None else result.value)
+
+        # Reference band, and from it LOW / NORMAL / HIGH, for every value with reference bands
+        self.bands: Dict[str, Band] = {}
+        self.status: Dict[str, int] = {}
+        values: Dict[str, float] = {}
+        for name, result in lab_values.items():
+            if name in rules.bands:
+                band = rules.classify(name, result.value)
+                self.bands[name] = band
+                self.status[name] = band.status
+                values[name] = result.value
+
+        self.results: Dict[str, RuleResult] = rules.evaluate(self.bands, values)
+
+    def has(self, name: str) -> bool:
+        return name in self.lab_values
+
+    def normal_count(self) -> int:
+        return sum(1 for status in self.status.values() if status == NORMAL)
+
+    def reaches(self, analyte: str, category: str) -> bool:
+        """Whether the analyte is in the given band or further from normal"""
+        band = self.bands.get(analyte)
+        if band is None:
+            return False
+        _, index, direction = self.rules.predicate(analyte, category)
+        return (band.index - index) * direction >= 0
+
+    def score(self, rule: str) -> int:
+        return self.results[rule].score
+
+    def notes(self, rule: str):
+        return self.results[rule].notes
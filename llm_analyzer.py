@@ -1,13 +1,49 @@
+import asyncio
 import logging
 import json
+import math
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+from caching import prompt_cache
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from conversation_memory import CHAT_CONTEXT_MAX_CHARS, Conversation, ConversationMemory, extractive_summary
+from document_chunking import chunk_document
+from keyword_matcher import KeywordMatcher, labels_found
+from prompt_compaction import LLM_PROMPT_COMPACTION, LLM_PROMPT_TOKEN_BUDGET, compact_document
+from llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, PRIORITY_STANDARD
+from llm_transport import LLMTransport
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model used for document analysis; part of the analysis cache key
+ANALYSIS_MODEL = "gpt-4o-mini"
+
+# Bump whenever the analysis prompt or chunking changes; part of the analysis cache key
+ANALYSIS_PROMPT_VERSION = "3"
+
+# Documents longer than one chunk are analyzed section by section and merged
+LLM_CHUNK_CHARS = max(500, int(os.getenv("LLM_CHUNK_CHARS", "2000")))
+LLM_CHUNK_CONCURRENCY = max(1, int(os.getenv("LLM_CHUNK_CONCURRENCY", "4")))
+
+# Very long documents get larger chunks rather than more than this many calls
+LLM_MAX_CHUNKS = max(1, int(os.getenv("LLM_MAX_CHUNKS", "12")))
+
+# Ordering used to pick the overall risk when merging chunk results
+RISK_LEVELS = ["low", "moderate", "high", "critical"]
+
+# Model used for chat and health insights; part of the prompt cache key
+CHAT_MODEL = "gpt-4o-mini"
+
+# Threads that fold old chat turns into conversation summaries, off the reply path
+CHAT_SUMMARY_WORKERS = max(1, int(os.getenv("CHAT_SUMMARY_WORKERS", "2")))
+
 # Check for OpenAI availability
 OPENAI_AVAILABLE = False
 try:
@@ -18,6 +54,26 @@ except ImportError:
     logger.warning("❌ OpenAI library not available")
 
 
+class LatencyWindow:
+    """Rolling window of latency samples with percentile summaries"""
+    
+    def __init__(self, size: int = 500):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+    
+    def record(self, milliseconds: float):
+        self.samples.append(milliseconds)
+        self.count += 1
+    
+    def summary(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {"count": self.count}
+        ordered = sorted(self.samples)
+        def percentile(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+        return {"count": self.count, "p50_ms": percentile(0.5), "p95_ms": percentile(0.95), "max_ms": round(ordered[-1], 1)}
+
+
 class MedicalKnowledgeBase:
     """
     Comprehensive medical knowledge base for enhanced AI analysis
@@ -68,20 +124,28 @@ class MedicalKnowledgeBase:
                 "Emergency situations require immediate medical intervention"
             ]
         }
+        
+        # Guideline topics a question can touch
+        self.guideline_topics = {
+            "blood_pressure": ["blood pressure", "bp", "hypertension"],
+            "glucose": ["glucose", "diabetes", "blood sugar"],
+            "cholesterol": ["cholesterol", "lipid"]
+        }
+        self.keywords = KeywordMatcher({"guideline": self.guideline_topics})
     
     def get_medical_context(self, query: str) -> str:
         """Get relevant medical context based on query"""
         context_parts = []
-        query_lower = query.lower()
         
         # Add relevant guidelines based on query content
-        if any(term in query_lower for term in ['blood pressure', 'bp', 'hypertension']):
+        topics = labels_found(self.keywords.find_all(query), "guideline")
+        if "blood_pressure" in topics:
             context_parts.append(f"Blood Pressure Guidelines: {self.medical_guidelines['vital_signs']['blood_pressure']}")
         
-        if any(term in query_lower for term in ['glucose', 'diabetes', 'blood sugar']):
+        if "glucose" in topics:
             context_parts.append(f"Glucose Guidelines: {self.medical_guidelines['laboratory_values']['glucose']}")
             
-        if any(term in query_lower for term in ['cholesterol', 'lipid']):
+        if "cholesterol" in topics:
             context_parts.append(f"Cholesterol Guidelines: {self.medical_guidelines['laboratory_values']['cholesterol']}")
         
         # Always include clinical warnings
@@ -97,10 +161,23 @@ class IntelligentLLMAnalyzer:
     
     def __init__(self):
         self.knowledge_base = MedicalKnowledgeBase()
-        self.openai_client = None
+        self.transport: Optional[LLMTransport] = None
         self.api_key_configured = False
         
-        # Initialize OpenAI client
+        # Time-to-first-token for streamed chat replies
+        self.chat_ttft = LatencyWindow()
+        
+        # Recent turns and a rolling summary per chat conversation
+        self.conversations = ConversationMemory()
+        self.summary_pool = ThreadPoolExecutor(max_workers=CHAT_SUMMARY_WORKERS, thread_name_prefix="chat-summary")
+        
+        # Trips when document analysis keeps failing so callers fail over fast
+        self.analysis_breaker = CircuitBreaker("llm_analysis")
+        
+        # Running totals of document tokens before and after prompt compaction
+        self.compaction_totals = {"analyses": 0, "raw_document_tokens": 0, "prompt_document_tokens": 0}
+        
+        # Open the shared LLM transport
         self._initialize_openai()
         
         # Medical AI system prompt
@@ -124,7 +201,7 @@ Your expertise includes:
 Always maintain professional medical ethics and patient safety as top priorities."""
 
     def _initialize_openai(self):
-        """Initialize OpenAI client with API key - v2.0"""
+        """Resolve the API key and open the pooled transport every AI call goes through"""
         try:
             if not OPENAI_AVAILABLE:
                 logger.warning("OpenAI library not available")
@@ -155,71 +232,183 @@ Always maintain professional medical ethics and patient safety as top priorities
                 logger.warning(f"💡 Available env vars: {sorted([k for k in os.environ.keys()])[:10]}")
                 return
             
-            # Initialize OpenAI client with just the API key
             try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=api_key)
+                self.transport = LLMTransport(api_key)
                 self.api_key_configured = True
-                logger.info("✅ OpenAI client initialized successfully")
-            except TypeError as type_err:
-                # Handle the 'proxies' parameter issue - try without extra params
-                logger.warning(f"⚠️ TypeError during initialization: {type_err}")
-                logger.info("🔧 Attempting workaround initialization...")
-                try:
-                    import openai as oai
-                    oai.api_key = api_key
-                    self.openai_client = oai
-                    self.api_key_configured = True
-                    logger.info("✅ OpenAI configured via global API key (workaround)")
-                except Exception as e2:
-                    logger.error(f"❌ Workaround failed: {e2}")
-                    self.api_key_configured = False
-                    return
+                logger.info(f"✅ OpenAI transport initialized (pool of {self.transport.pool_size} keep-alive connections)")
             except Exception as init_error:
-                logger.error(f"❌ Failed to initialize OpenAI client: {str(init_error)}")
+                logger.error(f"❌ Failed to initialize OpenAI transport: {str(init_error)}")
                 self.api_key_configured = False
                 return
-                # Still mark as configured since the client was created successfully
-                logger.info("✅ OpenAI client ready (test skipped)")
                 
         except Exception as e:
             logger.error(f"Error initializing OpenAI: {e}")
             self.api_key_configured = False
 
-    def analyze_document(self, document_text: str) -> Dict[str, Any]:
+    def analyze_document(self, document_text: str, priority: int = PRIORITY_STANDARD) -> Dict[str, Any]:
         """
-        Comprehensive medical document analysis using AI
+        Comprehensive medical document analysis using AI.
+        Raises CircuitOpenError without calling the API while the breaker is open.
         """
         logger.info("🔍 Starting AI-powered medical document analysis")
         
-        # Try to get API key directly
-        api_key = os.getenv("OPENAI_API_KEY")
-        logger.info(f"🔑 API key check: {'Found (' + str(len(api_key)) + ' chars)' if api_key else 'NOT FOUND'}")
-        
-        if not api_key:
+        if not self.api_key_configured:
             logger.warning("❌ No API key found, using fallback")
             return self._create_fallback_analysis(document_text)
         
         try:
-            # Use old-style openai module API to avoid Client class issues
-            logger.info("🔧 Configuring OpenAI with old-style API...")
-            import openai
-            openai.api_key = api_key
-            logger.info("✅ OpenAI API key configured")
+            chunks, compaction = self._prepare_document(document_text)
+            if len(chunks) == 1:
+                analysis_result = self._parse_analysis_response(self._analyze_chunk(chunks[0], priority))
+            else:
+                logger.info(f"🧩 Analyzing {len(chunks)} sections with up to {LLM_CHUNK_CONCURRENCY} in parallel")
+                with ThreadPoolExecutor(max_workers=min(LLM_CHUNK_CONCURRENCY, len(chunks))) as pool:
+                    futures = [pool.submit(self._analyze_chunk, chunk, priority, (index, len(chunks))) for index, chunk in enumerate(chunks)]
+                    outcomes = []
+                    for future in futures:
+                        try:
+                            outcomes.append(future.result())
+                        except Exception as chunk_error:
+                            outcomes.append(chunk_error)
+                analysis_result = self._merge_chunk_outcomes(outcomes)
+            self._record_compaction(analysis_result, compaction)
+            logger.info("✅ AI medical analysis completed successfully")
+            return analysis_result
             
-            # Get relevant medical context
-            logger.info("📚 Getting medical context...")
-            medical_context = self.knowledge_base.get_medical_context(document_text)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error in AI analysis: {e}")
+            return self._create_fallback_analysis(document_text, error=str(e))
+
+    async def analyze_document_async(self, document_text: str, priority: int = PRIORITY_STANDARD) -> Dict[str, Any]:
+        """
+        Non-blocking variant of analyze_document using the pooled async transport.
+        Raises CircuitOpenError without calling the API while the breaker is open.
+        """
+        logger.info("🔍 Starting async AI-powered medical document analysis")
+        
+        if not self.api_key_configured:
+            logger.warning("❌ No API key found, using fallback")
+            return self._create_fallback_analysis(document_text)
+        
+        try:
+            # Rule-based pre-extraction is CPU work; keep it off the event loop
+            chunks, compaction = await asyncio.to_thread(self._prepare_document, document_text)
+            if len(chunks) == 1:
+                analysis_result = self._parse_analysis_response(await self._analyze_chunk_async(chunks[0], priority))
+            else:
+                logger.info(f"🧩 Analyzing {len(chunks)} sections with up to {LLM_CHUNK_CONCURRENCY} in parallel")
+                semaphore = asyncio.Semaphore(LLM_CHUNK_CONCURRENCY)
+                
+                async def analyze_section(index: int, chunk: str) -> str:
+                    async with semaphore:
+                        return await self._analyze_chunk_async(chunk, priority, (index, len(chunks)))
+                
+                outcomes = await asyncio.gather(
+                    *(analyze_section(index, chunk) for index, chunk in enumerate(chunks)),
+                    return_exceptions=True
+                )
+                analysis_result = self._merge_chunk_outcomes(list(outcomes))
+            self._record_compaction(analysis_result, compaction)
+            logger.info("✅ Async AI medical analysis completed successfully")
+            return analysis_result
             
-            # Create comprehensive analysis prompt
-            analysis_prompt = f"""
-Analyze the following medical document comprehensively:
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error in async AI analysis: {e}")
+            return self._create_fallback_analysis(document_text, error=str(e))
+
+    def _prepare_document(self, document_text: str):
+        """
+        Document content for each analysis call, plus compaction stats.
+        With compaction on, prompts carry the rule-extracted facts and only
+        the narrative the rules cannot parse, within LLM_PROMPT_TOKEN_BUDGET.
+        """
+        if not LLM_PROMPT_COMPACTION:
+            return self._chunk_document(document_text), None
+        compacted = compact_document(document_text, LLM_PROMPT_TOKEN_BUDGET, LLM_MAX_CHUNKS)
+        stats = compacted.stats
+        logger.info(f"🗜️ Prompt compacted {stats['raw_document_tokens']} -> {stats['prompt_document_tokens']} document tokens")
+        return compacted.parts, stats
+
+    def _record_compaction(self, analysis_result: Dict[str, Any], compaction: Optional[Dict[str, Any]]):
+        if compaction is None:
+            return
+        analysis_result["prompt_compaction"] = compaction
+        self.compaction_totals["analyses"] += 1
+        self.compaction_totals["raw_document_tokens"] += compaction["raw_document_tokens"]
+        self.compaction_totals["prompt_document_tokens"] += compaction["prompt_document_tokens"]
+
+    def compaction_summary(self) -> Dict[str, Any]:
+        totals = dict(self.compaction_totals)
+        totals["enabled"] = LLM_PROMPT_COMPACTION
+        sent = totals["prompt_document_tokens"]
+        totals["reduction"] = round(totals["raw_document_tokens"] / sent, 2) if sent else None
+        return totals
+
+    def _chunk_document(self, document_text: str) -> List[str]:
+        """Section-aligned chunks, sized so no document needs more than LLM_MAX_CHUNKS calls"""
+        chunk_chars = max(LLM_CHUNK_CHARS, math.ceil(len(document_text) / LLM_MAX_CHUNKS))
+        return chunk_document(document_text, chunk_chars) or [document_text]
+
+    def _analysis_messages(self, chunk: str, part: Optional[tuple] = None) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self._build_analysis_prompt(chunk, part)}
+        ]
+
+    def _analyze_chunk(self, chunk: str, priority: int, part: Optional[tuple] = None) -> str:
+        """Blocking analysis of one chunk; returns the raw model output"""
+        response = self.transport.chat_completion(
+            priority=priority,
+            breaker=self.analysis_breaker,
+            model=ANALYSIS_MODEL,
+            messages=self._analysis_messages(chunk, part),
+            max_tokens=1500,
+            temperature=0.1
+        )
+        return response.choices[0].message.content
+
+    async def _analyze_chunk_async(self, chunk: str, priority: int, part: Optional[tuple] = None) -> str:
+        """Async analysis of one chunk; returns the raw model output"""
+        response = await self.transport.chat_completion_async(
+            priority=priority,
+            breaker=self.analysis_breaker,
+            model=ANALYSIS_MODEL,
+            messages=self._analysis_messages(chunk, part),
+            max_tokens=1500,
+            temperature=0.1
+        )
+        return response.choices[0].message.content
+
+    def _build_analysis_prompt(self, document_text: str, part: Optional[tuple] = None) -> str:
+        """Build the document analysis prompt with relevant medical context"""
+        # Get relevant medical context
+        logger.info("📚 Getting medical context...")
+        medical_context = self.knowledge_base.get_medical_context(document_text)
+        
+        # Sections of a longer document are analyzed on their own and merged afterwards
+        scope = "the following medical document"
+        if part is not None:
+            scope = f"section {part[0] + 1} of {part[1]} of a longer medical document (report only what this section contains)"
+        
+        notes = ""
+        if LLM_PROMPT_COMPACTION:
+            notes = "\nThe document has been condensed: values already parsed from it are listed as pre-extracted facts, followed by the narrative text that could not be parsed."
+            if part is not None and part[0] > 0:
+                notes += " The pre-extracted facts were already reported with section 1; do not list them again as findings."
+        
+        # Create comprehensive analysis prompt
+        return f"""
+Analyze {scope} comprehensively:{notes}
 
 MEDICAL CONTEXT:
 {medical_context}
 
 DOCUMENT TO ANALYZE:
-{document_text[:2000]}
+{document_text}
 
 Please provide a detailed medical analysis in JSON format with these exact fields:
 {{
@@ -251,87 +440,315 @@ Please provide a detailed medical analysis in JSON format with these exact field
     ]
 }}"""
 
-            # Get AI analysis using old-style API
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",  # Use the configured model
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": analysis_prompt}
+    def _parse_analysis_response(self, analysis_text: str) -> Dict[str, Any]:
+        """Turn the raw model output into the analysis result schema"""
+        # Try to parse JSON response
+        try:
+            # Clean up the response text to extract JSON
+            json_start = analysis_text.find('{')
+            json_end = analysis_text.rfind('}') + 1
+            if json_start >= 0 and json_end > json_start:
+                json_text = analysis_text[json_start:json_end]
+                analysis_result = json.loads(json_text)
+            else:
+                raise json.JSONDecodeError("No JSON found", analysis_text, 0)
+        except json.JSONDecodeError:
+            logger.warning("JSON parsing failed, creating structured response from text")
+            # Create structured response if JSON parsing fails
+            analysis_result = {
+                "summary": analysis_text[:200] if len(analysis_text) > 200 else analysis_text,
+                "findings": [
+                    {
+                        "description": "AI Medical Analysis",
+                        "value": "Comprehensive review completed",
+                        "interpretation": analysis_text[:400] if len(analysis_text) > 400 else analysis_text,
+                        "severity": "informational"
+                    }
                 ],
-                max_tokens=1500,
-                temperature=0.1
-            )
-            
-            analysis_text = response.choices[0].message.content
+                "risk_assessment": {
+                    "overall_risk": "See detailed analysis",
+                    "risk_factors": ["Detailed analysis provided"],
+                    "immediate_concerns": []
+                },
+                "recommendations": [analysis_text[400:800] if len(analysis_text) > 400 else "Consult healthcare provider for interpretation"],
+                "follow_up": ["Discuss results with healthcare provider"],
+                "lifestyle_advice": ["Follow general health guidelines"],
+                "provider_questions": ["Review AI analysis with your doctor"]
+            }
+        
+        # Add metadata
+        analysis_result.update({
+            "confidence_score": 90,
+            "analysis_method": "AI-powered with medical knowledge base",
+            "model_used": ANALYSIS_MODEL,
+            "timestamp": datetime.now().isoformat(),
+            "ai_powered": True,
+            "full_analysis": analysis_text
+        })
+        return analysis_result
+
+    def _merge_chunk_outcomes(self, outcomes: List[Any]) -> Dict[str, Any]:
+        """
+        Reduce per-section model outputs (or the exceptions they raised) into
+        one result in the standard schema: findings and list fields are
+        concatenated without duplicates, and the highest section risk wins.
+        Raises the first error if no section succeeded.
+        """
+        raw_outputs = [outcome for outcome in outcomes if isinstance(outcome, str)]
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if not raw_outputs:
+            raise errors[0]
+        if errors:
+            logger.warning(f"⚠️ {len(errors)} of {len(outcomes)} sections failed analysis: {errors[0]}")
+        
+        parts = [self._parse_analysis_response(raw) for raw in raw_outputs]
+        
+        def merged_list(items) -> List[Any]:
+            seen = set()
+            merged = []
+            for item in items:
+                key = json.dumps(item, sort_keys=True).lower() if isinstance(item, (dict, list)) else str(item).strip().lower()
+                if key and key not in seen:
+                    seen.add(key)
+                    merged.append(item)
+            return merged
+        
+        def list_field(result: Dict[str, Any], name: str) -> List[Any]:
+            value = result.get(name) or []
+            return value if isinstance(value, list) else [value]
+        
+        risks = [part.get("risk_assessment") or {} for part in parts]
+        section_levels = [str(risk.get("overall_risk", "")).lower() for risk in risks]
+        known_levels = [level for level in section_levels if level in RISK_LEVELS]
+        
+        merged = {
+            "summary": " ".join(str(part.get("summary", "")).strip() for part in parts if part.get("summary")),
+            "findings": merged_list(finding for part in parts for finding in list_field(part, "findings")),
+            "risk_assessment": {
+                "overall_risk": max(known_levels, key=RISK_LEVELS.index) if known_levels else (section_levels[0] or "See detailed analysis"),
+                "risk_factors": merged_list(factor for risk in risks for factor in (risk.get("risk_factors") or [])),
+                "immediate_concerns": merged_list(concern for risk in risks for concern in (risk.get("immediate_concerns") or []))
+            }
+        }
+        for name in ("recommendations", "follow_up", "lifestyle_advice", "provider_questions"):
+            merged[name] = merged_list(item for part in parts for item in list_field(part, name))
+        
+        merged.update({
+            "confidence_score": 90 if not errors else 75,
+            "analysis_method": f"AI-powered with medical knowledge base ({len(outcomes)} sections analyzed in parallel)",
+            "model_used": ANALYSIS_MODEL,
+            "timestamp": datetime.now().isoformat(),
+            "ai_powered": True,
+            "sections_analyzed": len(raw_outputs),
+            "sections_failed": len(errors),
+            "full_analysis": "\n\n".join(raw_outputs)
+        })
+        return merged
+
+    def chat_with_ai(self, user_message: str, conversation_context: Optional[str] = None, conversation_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Intelligent medical AI chat with conversation context
+        """
+        logger.info(f"💬 Processing chat message: {user_message[:100]}...")
+        
+        if not self.api_key_configured:
+            return self._create_fallback_chat_response(user_message)
+        
+        try:
+            conversation = self.conversations.open(conversation_id)
+            messages = self._chat_messages(conversation, user_message, conversation_context)
+            ai_response = self._cached_completion(messages, max_tokens=500, temperature=0.2, priority=PRIORITY_INTERACTIVE)
             
-            # Try to parse JSON response
-            try:
-                # Clean up the response text to extract JSON
-                json_start = analysis_text.find('{')
-                json_end = analysis_text.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_text = analysis_text[json_start:json_end]
-                    analysis_result = json.loads(json_text)
-                else:
-                    raise json.JSONDecodeError("No JSON found", analysis_text, 0)
-            except json.JSONDecodeError:
-                logger.warning("JSON parsing failed, creating structured response from text")
-                # Create structured response if JSON parsing fails
-                analysis_result = {
-                    "summary": analysis_text[:200] if len(analysis_text) > 200 else analysis_text,
-                    "findings": [
-                        {
-                            "description": "AI Medical Analysis",
-                            "value": "Comprehensive review completed",
-                            "interpretation": analysis_text[:400] if len(analysis_text) > 400 else analysis_text,
-                            "severity": "informational"
-                        }
-                    ],
-                    "risk_assessment": {
-                        "overall_risk": "See detailed analysis",
-                        "risk_factors": ["Detailed analysis provided"],
-                        "immediate_concerns": []
-                    },
-                    "recommendations": [analysis_text[400:800] if len(analysis_text) > 400 else "Consult healthcare provider for interpretation"],
-                    "follow_up": ["Discuss results with healthcare provider"],
-                    "lifestyle_advice": ["Follow general health guidelines"],
-                    "provider_questions": ["Review AI analysis with your doctor"]
-                }
+            self._remember_turn(conversation, user_message, ai_response)
+            return self._create_chat_response(ai_response, conversation.id)
             
-            # Add metadata
-            analysis_result.update({
-                "confidence_score": 90,
-                "analysis_method": "AI-powered with medical knowledge base",
-                "model_used": "gpt-4o-mini",
-                "timestamp": datetime.now().isoformat(),
-                "ai_powered": True,
-                "full_analysis": analysis_text
-            })
+        except Exception as e:
+            logger.error(f"❌ Error in chat processing: {e}")
+            return self._create_fallback_chat_response(user_message, error=str(e))
+
+    async def chat_with_ai_async(self, user_message: str, conversation_context: Optional[str] = None, conversation_id: Optional[str] = None) -> Dict[str, Any]:
+        """chat_with_ai over the async transport, without holding a worker thread"""
+        logger.info(f"💬 Processing chat message: {user_message[:100]}...")
+        
+        if not self.api_key_configured:
+            return self._create_fallback_chat_response(user_message)
+        
+        try:
+            conversation = self.conversations.open(conversation_id)
+            messages = self._chat_messages(conversation, user_message, conversation_context)
+            ai_response = await self._cached_completion_async(messages, max_tokens=500, temperature=0.2, priority=PRIORITY_INTERACTIVE)
             
-            logger.info("✅ AI medical analysis completed successfully")
-            return analysis_result
+            self._remember_turn(conversation, user_message, ai_response)
+            return self._create_chat_response(ai_response, conversation.id)
             
         except Exception as e:
-            logger.error(f"❌ Error in AI analysis: {e}")
-            return self._create_fallback_analysis(document_text, error=str(e))
+            logger.error(f"❌ Error in chat processing: {e}")
+            return self._create_fallback_chat_response(user_message, error=str(e))
+
+    def _cached_completion(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float, priority: int = PRIORITY_STANDARD) -> str:
+        """Chat model reply to these messages, from the prompt cache when possible"""
+        cache_key = prompt_cache.make_key(CHAT_MODEL, temperature, max_tokens, messages)
+        text = prompt_cache.get(cache_key)
+        if text is None:
+            response = self.transport.chat_completion(
+                priority=priority,
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            text = response.choices[0].message.content
+            prompt_cache.set(cache_key, text)
+        return text
 
-    def chat_with_ai(self, user_message: str, conversation_context: Optional[str] = None) -> Dict[str, Any]:
+    async def _cached_completion_async(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float, priority: int = PRIORITY_STANDARD) -> str:
+        """_cached_completion over the async transport; only the cache backend runs in a thread"""
+        cache_key = prompt_cache.make_key(CHAT_MODEL, temperature, max_tokens, messages)
+        text = await asyncio.to_thread(prompt_cache.get, cache_key)
+        if text is None:
+            response = await self.transport.chat_completion_async(
+                priority=priority,
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            text = response.choices[0].message.content
+            await asyncio.to_thread(prompt_cache.set, cache_key, text)
+        return text
+
+    async def chat_stream(self, user_message: str, conversation_context: Optional[str] = None, conversation_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
         """
-        Intelligent medical AI chat with conversation context
+        Stream a chat reply token by token.
+        Yields {"type": "token", "content": ...} events followed by one
+        {"type": "done", ...} event carrying the same metadata as chat_with_ai.
         """
-        logger.info(f"💬 Processing chat message: {user_message[:100]}...")
+        logger.info(f"💬 Streaming chat message: {user_message[:100]}...")
+        started = time.perf_counter()
         
         if not self.api_key_configured:
-            return self._create_fallback_chat_response(user_message)
+            fallback = self._create_fallback_chat_response(user_message)
+            yield {"type": "token", "content": fallback["response"]}
+            yield {"type": "done", **fallback}
+            return
+        
+        conversation = self.conversations.open(conversation_id)
+        messages = self._chat_messages(conversation, user_message, conversation_context)
+        cache_key = prompt_cache.make_key(CHAT_MODEL, 0.2, 500, messages)
+        cached_response = await asyncio.to_thread(prompt_cache.get, cache_key)
+        if cached_response is not None:
+            ttft_ms = (time.perf_counter() - started) * 1000
+            self.chat_ttft.record(ttft_ms)
+            yield {"type": "token", "content": cached_response}
+            self._remember_turn(conversation, user_message, cached_response)
+            done = self._create_chat_response(cached_response, conversation.id)
+            done.update({"time_to_first_token_ms": round(ttft_ms, 1), "total_time_ms": round(ttft_ms, 1), "cached": True})
+            yield {"type": "done", **done}
+            return
         
+        parts = []
+        ttft_ms = None
+        stream = None
         try:
-            # Get relevant medical context for the question
-            medical_context = self.knowledge_base.get_medical_context(user_message)
-            
-            # Create comprehensive chat prompt
-            chat_prompt = f"""
-User Question: {user_message}
+            stream = await self.transport.chat_completion_async(
+                priority=PRIORITY_INTERACTIVE,
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=500,
+                temperature=0.2,
+                stream=True
+            )
+            async for chunk in stream:
+                content = chunk["choices"][0]["delta"].get("content")
+                if not content:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                    self.chat_ttft.record(ttft_ms)
+                    logger.info(f"⚡ Chat time-to-first-token: {ttft_ms:.0f} ms")
+                parts.append(content)
+                yield {"type": "token", "content": content}
+        except Exception as e:
+            logger.error(f"❌ Error in streaming chat: {e}")
+            if not parts:
+                fallback = self._create_fallback_chat_response(user_message, error=str(e))
+                yield {"type": "token", "content": fallback["response"]}
+                yield {"type": "done", **fallback}
+                return
+            yield {"type": "error", "detail": str(e)}
+        finally:
+            # Gives the scheduler permit back even when the client disconnects mid-stream
+            if stream is not None:
+                await stream.aclose()
+        
+        full_response = "".join(parts)
+        if full_response:
+            await asyncio.to_thread(prompt_cache.set, cache_key, full_response)
+            self._remember_turn(conversation, user_message, full_response)
+        done = self._create_chat_response(full_response, conversation.id)
+        done["time_to_first_token_ms"] = round(ttft_ms, 1) if ttft_ms is not None else None
+        done["total_time_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        yield {"type": "done", **done}
+
+    def _chat_messages(self, conversation: Conversation, user_message: str, conversation_context: Optional[str] = None) -> List[Dict[str, str]]:
+        """System prompt, the conversation's summary and recent turns, then the new question"""
+        return [
+            {"role": "system", "content": self.system_prompt},
+            *conversation.history_messages(),
+            {"role": "user", "content": self._build_chat_prompt(user_message, conversation_context)}
+        ]
+
+    def _remember_turn(self, conversation: Conversation, user_message: str, ai_response: str):
+        """
+        Add an exchange to the conversation. Turns that left the window are
+        folded into the summary extractively right away, and the model's
+        summary replaces that in the background, so the reply never waits
+        for a summarization call.
+        """
+        folded = conversation.add_turn(user_message, ai_response)
+        if folded:
+            previous = conversation.summary
+            placeholder = extractive_summary(previous, folded)
+            conversation.set_summary(placeholder)
+            self.summary_pool.submit(self._summarize_turns, conversation, placeholder, previous, folded)
+        self.conversations.save(conversation)
+
+    def _summarize_turns(self, conversation: Conversation, placeholder: str, summary: str, turns: List[tuple]):
+        """Replace the extractive fold of these exchanges with the model's summary, if it is still current"""
+        try:
+            updated = self._model_summary(summary, turns)
+        except Exception as e:
+            logger.warning(f"⚠️ Conversation summary failed, keeping an extractive one: {e}")
+            return
+        if conversation.replace_summary(placeholder, updated):
+            self.conversations.summaries += 1
+
+    def _model_summary(self, summary: str, turns: List[tuple]) -> str:
+        """Fold older exchanges into the rolling summary with the model"""
+        transcript = "\n".join(f"User: {question}\nAssistant: {reply}" for question, reply in turns)
+        messages = [
+            {"role": "system", "content": "You maintain a running summary of a medical chat. Keep the user's health details, questions asked and advice given. Reply with the updated summary only, under 150 words."},
+            {"role": "user", "content": f"Current summary: {summary or 'None yet'}\n\nNew exchanges:\n{transcript}"}
+        ]
+        response = self.transport.chat_completion(
+            priority=PRIORITY_BATCH,
+            model=CHAT_MODEL,
+            messages=messages,
+            max_tokens=250,
+            temperature=0
+        )
+        return response.choices[0].message.content.strip()
 
+    def _build_chat_prompt(self, user_message: str, conversation_context: Optional[str] = None) -> str:
+        """Build the chat prompt with guidelines relevant to the question"""
+        # Get relevant medical context for the question
+        medical_context = self.knowledge_base.get_medical_context(user_message)
+        context_section = f"\nAdditional Context:\n{conversation_context[:CHAT_CONTEXT_MAX_CHARS]}\n" if conversation_context else ""
+        
+        # Create comprehensive chat prompt
+        return f"""
+User Question: {user_message}
+{context_section}
 Relevant Medical Guidelines:
 {medical_context}
 
@@ -343,31 +760,16 @@ Please provide a helpful, accurate response about this medical question. Remembe
 5. Highlight any red flags that need immediate medical attention
 """
 
-            # Get AI response
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": chat_prompt}
-                ],
-                max_tokens=500,
-                temperature=0.2
-            )
-            
-            ai_response = response.choices[0].message.content
-            
-            return {
-                "response": ai_response,
-                "sources": ["Medical knowledge base", "Clinical guidelines"],
-                "conversation_id": f"medisure_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                "timestamp": datetime.now().isoformat(),
-                "ai_powered": True,
-                "confidence": 95
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Error in chat processing: {e}")
-            return self._create_fallback_chat_response(user_message, error=str(e))
+    def _create_chat_response(self, ai_response: str, conversation_id: str) -> Dict[str, Any]:
+        """Wrap an AI chat reply with the standard response metadata"""
+        return {
+            "response": ai_response,
+            "sources": ["Medical knowledge base", "Clinical guidelines"],
+            "conversation_id": conversation_id,
+            "timestamp": datetime.now().isoformat(),
+            "ai_powered": True,
+            "confidence": 95
+        }
 
     def get_health_insights(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -377,12 +779,33 @@ Please provide a helpful, accurate response about this medical question. Remembe
             return self._create_fallback_insights()
         
         try:
-            insights_prompt = f"""
+            insights_text = self._cached_completion(self._insights_messages(analysis_data), max_tokens=800, temperature=0.1)
+            return self._parse_insights(insights_text)
+            
+        except Exception as e:
+            logger.error(f"Error generating health insights: {e}")
+            return self._create_fallback_insights()
+
+    async def get_health_insights_async(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+        """get_health_insights over the async transport"""
+        if not self.api_key_configured:
+            return self._create_fallback_insights()
+        
+        try:
+            insights_text = await self._cached_completion_async(self._insights_messages(analysis_data), max_tokens=800, temperature=0.1)
+            return self._parse_insights(insights_text)
+            
+        except Exception as e:
+            logger.error(f"Error generating health insights: {e}")
+            return self._create_fallback_insights()
+
+    def _insights_messages(self, analysis_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        insights_prompt = f"""
 Based on the following medical analysis, provide personalized health insights:
 
 Analysis Summary: {analysis_data.get('summary', 'Medical analysis completed')}
 Key Findings: {analysis_data.get('findings', [])}
-
+{self._followup_facts(analysis_data)}
 Please provide specific insights in JSON format:
 {{
     "trends": "Key health trends and patterns identified",
@@ -394,38 +817,110 @@ Please provide specific insights in JSON format:
 }}
 """
 
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": insights_prompt}
-                ],
-                max_tokens=800,
-                temperature=0.1
-            )
-            
-            insights_text = response.choices[0].message.content
-            
-            try:
-                insights = json.loads(insights_text)
-            except json.JSONDecodeError:
-                insights = {
-                    "trends": "AI-powered analysis reveals important health patterns",
-                    "preventive_care": ["Regular health screenings", "Follow medical recommendations"],
-                    "risk_mitigation": ["Address identified risk factors", "Maintain healthy lifestyle"],
-                    "lifestyle_tips": ["Balanced nutrition", "Regular exercise", "Adequate sleep", "Stress management"],
-                    "monitoring": ["Track key health metrics", "Regular medical check-ups"],
-                    "provider_questions": ["Discuss AI analysis results", "Review risk factors", "Plan preventive care"]
-                }
-            
-            insights["ai_powered"] = True
-            insights["timestamp"] = datetime.now().isoformat()
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": insights_prompt}
+        ]
+        return messages
+
+    @staticmethod
+    def _parse_insights(insights_text: str) -> Dict[str, Any]:
+        try:
+            insights = json.loads(insights_text)
+        except json.JSONDecodeError:
+            insights = {
+                "trends": "AI-powered analysis reveals important health patterns",
+                "preventive_care": ["Regular health screenings", "Follow medical recommendations"],
+                "risk_mitigation": ["Address identified risk factors", "Maintain healthy lifestyle"],
+                "lifestyle_tips": ["Balanced nutrition", "Regular exercise", "Adequate sleep", "Stress management"],
+                "monitoring": ["Track key health metrics", "Regular medical check-ups"],
+                "provider_questions": ["Discuss AI analysis results", "Review risk factors", "Plan preventive care"]
+            }
+        
+        insights["ai_powered"] = True
+        insights["timestamp"] = datetime.now().isoformat()
+        
+        return insights
+
+    def generate_medical_report(self, analysis_data: Dict[str, Any], patient_info: Dict[str, str] = None) -> Dict[str, Any]:
+        """
+        Generate a SOAP-format medical report with a patient-friendly explanation
+        """
+        if not self.api_key_configured:
+            return self._create_fallback_report(analysis_data, patient_info)
+        
+        try:
+            report_text = self._cached_completion(self._report_messages(analysis_data, patient_info), max_tokens=1500, temperature=0.1)
+            return self._build_report(report_text, analysis_data, patient_info)
             
-            return insights
+        except Exception as e:
+            logger.error(f"Error generating medical report: {e}")
+            return self._create_fallback_report(analysis_data, patient_info)
+
+    async def generate_medical_report_async(self, analysis_data: Dict[str, Any], patient_info: Dict[str, str] = None) -> Dict[str, Any]:
+        """generate_medical_report over the async transport"""
+        if not self.api_key_configured:
+            return self._create_fallback_report(analysis_data, patient_info)
+        
+        try:
+            report_text = await self._cached_completion_async(self._report_messages(analysis_data, patient_info), max_tokens=1500, temperature=0.1)
+            return self._build_report(report_text, analysis_data, patient_info)
             
         except Exception as e:
-            logger.error(f"Error generating health insights: {e}")
-            return self._create_fallback_insights()
+            logger.error(f"Error generating medical report: {e}")
+            return self._create_fallback_report(analysis_data, patient_info)
+
+    def _report_messages(self, analysis_data: Dict[str, Any], patient_info: Optional[Dict[str, str]]) -> List[Dict[str, str]]:
+        report_prompt = f"""
+Write a professional medical report from the following analysis:
+
+Analysis Summary: {analysis_data.get('summary', 'Medical analysis completed')}
+Key Findings: {analysis_data.get('findings', [])}
+Overall Risk: {analysis_data.get('risk_assessment', {}).get('overall_risk', 'To be determined')}
+Recommendations: {analysis_data.get('recommendations', [])}
+{self._followup_facts(analysis_data)}Patient Information: {patient_info or 'Not provided'}
+
+Respond in JSON format:
+{{
+    "medical_report": {{
+        "subjective": "Presenting context",
+        "objective": {{"vital_signs": "", "laboratory_findings": "", "clinical_observations": ""}},
+        "assessment": {{"primary_diagnosis": "", "differential_diagnosis": [], "risk_stratification": "", "prognostic_indicators": ""}},
+        "plan": {{"immediate_interventions": [], "pharmacological": [], "non_pharmacological": [], "monitoring": [], "referrals": [], "patient_education": []}}
+    }},
+    "patient_explanation": {{"overview": "", "what_this_means": "", "action_steps": "", "when_to_worry": "", "positive_aspects": ""}}
+}}
+"""
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": report_prompt}
+        ]
+        return messages
+
+    def _build_report(self, report_text: str, analysis_data: Dict[str, Any], patient_info: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        """The fallback report with the model's sections filled in"""
+        generated = json.loads(report_text)
+        report = self._create_fallback_report(analysis_data, patient_info)
+        report.update({
+            "medical_report": generated.get("medical_report", report["medical_report"]),
+            "patient_explanation": generated.get("patient_explanation", report["patient_explanation"]),
+            "ai_generated": True
+        })
+        report.pop("note", None)
+        return report
+
+    @staticmethod
+    def _followup_facts(analysis_data: Dict[str, Any]) -> str:
+        """Lab values and conditions precomputed by the analysis, as prompt lines"""
+        lines = []
+        lab_values = analysis_data.get('lab_values') or {}
+        if lab_values:
+            lines.append("Lab Values: " + ", ".join(f"{name} {result['value']} {result.get('unit', '')}".rstrip() for name, result in lab_values.items()))
+        conditions = analysis_data.get('conditions') or []
+        if conditions:
+            lines.append("Detected Conditions: " + ", ".join(f"{condition['name']} ({condition['confidence']})" for condition in conditions))
+        return "".join(f"{line}\n" for line in lines)
 
     def _create_fallback_analysis(self, document_text: str, error: str = None) -> Dict[str, Any]:
         """Create fallback analysis when AI is unavailable"""
@@ -546,23 +1041,53 @@ Please provide specific insights in JSON format:
 # Create global intelligent analyzer instance
 intelligent_analyzer = IntelligentLLMAnalyzer()
 
-def analyze_medical_document_llm(document_text: str) -> Dict[str, Any]:
+def analyze_medical_document_llm(document_text: str, priority: int = PRIORITY_STANDARD) -> Dict[str, Any]:
     """Main function to analyze medical document using intelligent AI"""
-    return intelligent_analyzer.analyze_document(document_text)
+    return intelligent_analyzer.analyze_document(document_text, priority)
+
+async def analyze_medical_document_llm_async(document_text: str, priority: int = PRIORITY_STANDARD) -> Dict[str, Any]:
+    """Async entry point for AI document analysis that never blocks the event loop"""
+    return await intelligent_analyzer.analyze_document_async(document_text, priority)
 
-def chat_with_medical_ai(user_message: str, context: Optional[str] = None) -> Dict[str, Any]:
+def chat_with_medical_ai(user_message: str, context: Optional[str] = None, conversation_id: Optional[str] = None) -> Dict[str, Any]:
     """Main function for intelligent AI chat functionality"""
-    return intelligent_analyzer.chat_with_ai(user_message, context)
+    return intelligent_analyzer.chat_with_ai(user_message, context, conversation_id)
+
+async def chat_with_medical_ai_async(user_message: str, context: Optional[str] = None, conversation_id: Optional[str] = None) -> Dict[str, Any]:
+    """Async chat entry point that never blocks the event loop"""
+    return await intelligent_analyzer.chat_with_ai_async(user_message, context, conversation_id)
+
+def stream_chat_with_medical_ai(user_message: str, context: Optional[str] = None, conversation_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Main function for token-streaming AI chat"""
+    return intelligent_analyzer.chat_stream(user_message, context, conversation_id)
 
 def get_health_insights(analysis_data: Dict[str, Any]) -> Dict[str, Any]:
     """Main function to get intelligent health insights"""
     return intelligent_analyzer.get_health_insights(analysis_data)
 
+async def get_health_insights_async(analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Async health insights entry point that never blocks the event loop"""
+    return await intelligent_analyzer.get_health_insights_async(analysis_data)
+
 # Health check function
 def generate_medical_report(analysis_data: Dict[str, Any], patient_info: Dict[str, str] = None) -> Dict[str, Any]:
     """Generate comprehensive medical report with SOAP format"""
     return intelligent_analyzer.generate_medical_report(analysis_data, patient_info)
 
+async def generate_medical_report_async(analysis_data: Dict[str, Any], patient_info: Dict[str, str] = None) -> Dict[str, Any]:
+    """Async medical report entry point that never blocks the event loop"""
+    return await intelligent_analyzer.generate_medical_report_async(analysis_data, patient_info)
+
+def llm_circuit_status() -> Dict[str, Any]:
+    """State of the document-analysis circuit breaker"""
+    return intelligent_analyzer.analysis_breaker.status()
+
+async def close_llm_transport():
+    """Release pooled LLM connections on shutdown"""
+    intelligent_analyzer.summary_pool.shutdown(wait=False, cancel_futures=True)
+    if intelligent_analyzer.transport is not None:
+        await intelligent_analyzer.transport.aclose()
+
 def check_ai_status() -> Dict[str, Any]:
     """Check if AI features are properly configured"""
     return {
@@ -574,5 +1099,12 @@ def check_ai_status() -> Dict[str, Any]:
             "ai_chat": intelligent_analyzer.api_key_configured,
             "health_insights": intelligent_analyzer.api_key_configured,
             "medical_reports": intelligent_analyzer.api_key_configured
-        }
+        },
+        "transport": intelligent_analyzer.transport.status() if intelligent_analyzer.transport else None,
+        "scheduler": intelligent_analyzer.transport.scheduler.status() if intelligent_analyzer.transport else None,
+        "circuit_breaker": intelligent_analyzer.analysis_breaker.status(),
+        "prompt_compaction": intelligent_analyzer.compaction_summary(),
+        "chat_time_to_first_token": intelligent_analyzer.chat_ttft.summary(),
+        "conversation_memory": intelligent_analyzer.conversations.status(),
+        "prompt_cache": prompt_cache.status()
     }
\ No newline at end of file
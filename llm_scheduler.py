@@ -0,0 +1,377 @@
+# Rate-limit-aware admission control for LLM requests
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Provider budgets; 0 disables the corresponding bucket
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "200000"))
+
+# Ceiling for concurrent in-flight requests; the live limit adapts below it
+LLM_MAX_CONCURRENCY = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "16")))
+
+# Retries for rate-limited (429) or overloaded (503) responses
+LLM_MAX_RETRIES = max(0, int(os.getenv("LLM_MAX_RETRIES", "5")))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Queue priorities - lower values are admitted first
+PRIORITY_INTERACTIVE = 0  # chat
+PRIORITY_STANDARD = 1     # single-document analysis, health insights
+PRIORITY_BATCH = 2        # batch uploads and background jobs
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_STANDARD: "standard", PRIORITY_BATCH: "batch"}
+
+# Status codes worth retrying after a pause
+RETRYABLE_STATUSES = (429, 503)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int = 0) -> int:
+    """Rough prompt + completion token estimate (about four characters per token)"""
+    return sum(len(message.get("content") or "") for message in messages) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; not thread-safe on its own"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 when available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Return unused tokens (positive) or charge extra usage (negative)"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "wake", "granted", "cancelled")
+
+    def __init__(self, priority: int, seq: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class HeldStream:
+    """
+    Async iterator over a streamed response that holds a scheduler permit.
+    The permit is released once, when the stream ends, fails or is closed
+    (or, as a last resort, when the wrapper is garbage collected).
+    """
+
+    def __init__(self, stream: Any, release: Callable[..., None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    def _finish(self, success: bool):
+        if not self._released:
+            self._released = True
+            self._release(success=success)
+
+    def __aiter__(self) -> "HeldStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._finish(success=True)
+            raise
+        except BaseException:
+            self._finish(success=False)
+            raise
+
+    async def aclose(self):
+        """Stop reading early: give the permit back and close the underlying stream"""
+        self._finish(success=False)
+        close = getattr(self._stream, "aclose", None)
+        if close is not None:
+            await close()
+
+    def __del__(self):
+        self._finish(success=False)
+
+
+class LLMScheduler:
+    """
+    Priority queue in front of the provider. A request is admitted when it
+    is first in line, the adaptive concurrency limit has room, and both the
+    requests-per-minute and tokens-per-minute buckets can cover it. 429/503
+    responses are retried with jittered exponential backoff, drain the
+    request bucket and halve the concurrency limit; successes grow it back.
+    Usable from worker threads and from the event loop alike.
+    """
+
+    def __init__(
+        self,
+        rpm: int = LLM_RPM_LIMIT,
+        tpm: int = LLM_TPM_LIMIT,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES
+    ):
+        self.rpm_bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.tpm_bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.limit = max_concurrency
+        self.active = 0
+
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._timer: Optional[threading.Timer] = None
+        self._resume_at = 0.0
+        self._successes_since_increase = 0
+        self._last_decrease = 0.0
+
+        self.completed = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    # Admission
+
+    def _dispatch(self):
+        """Admit queued requests while budgets allow; caller holds the lock"""
+        while self._queue and self.active < self.limit:
+            waiter = self._queue[0]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            now = time.monotonic()
+            delay = self._resume_at - now
+            if self.rpm_bucket:
+                delay = max(delay, self.rpm_bucket.delay_for(1, now))
+            if self.tpm_bucket:
+                delay = max(delay, self.tpm_bucket.delay_for(waiter.tokens, now))
+            if delay > 0:
+                self._schedule_dispatch(delay)
+                return
+            heapq.heappop(self._queue)
+            if self.rpm_bucket:
+                self.rpm_bucket.take(1)
+            if self.tpm_bucket:
+                self.tpm_bucket.take(waiter.tokens)
+            self.active += 1
+            waiter.granted = True
+            waiter.wake()
+
+    def _schedule_dispatch(self, delay: float):
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _enqueue(self, waiter: _Waiter):
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+            self._dispatch()
+
+    def _acquire(self, priority: int, seq: int, tokens: int):
+        admitted = threading.Event()
+        self._enqueue(_Waiter(priority, seq, tokens, admitted.set))
+        admitted.wait()
+
+    async def _acquire_async(self, priority: int, seq: int, tokens: int):
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+            except RuntimeError:
+                # Loop already closed; hand the permit straight back (called under the lock)
+                waiter.cancelled = True
+                waiter.granted = False
+                self.active -= 1
+
+        waiter = _Waiter(priority, seq, tokens, wake)
+        self._enqueue(waiter)
+        try:
+            await admitted
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                granted = waiter.granted
+            if granted:
+                self._release(success=False)
+            raise
+
+    def _release(self, success: bool, token_adjustment: float = 0.0):
+        with self._lock:
+            self.active -= 1
+            if success:
+                self.completed += 1
+                self._successes_since_increase += 1
+                if self._successes_since_increase >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes_since_increase = 0
+            if token_adjustment and self.tpm_bucket:
+                self.tpm_bucket.adjust(token_adjustment)
+            self._dispatch()
+
+    # Rate-limit handling
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None if the error is not retryable"""
+        status = getattr(error, "http_status", None)
+        if status not in RETRYABLE_STATUSES:
+            return None
+
+        retry_after = None
+        headers = getattr(error, "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after") or headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+
+        with self._lock:
+            now = time.monotonic()
+            if status == 429:
+                self.rate_limited += 1
+                if self.rpm_bucket:
+                    self.rpm_bucket.drain()
+                # One decrease per burst, not one per request that was already in flight
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(1, self.limit // 2)
+                    self._last_decrease = now
+                    self._successes_since_increase = 0
+            if retry_after:
+                self._resume_at = max(self._resume_at, now + retry_after)
+            if attempt >= self.max_retries:
+                self.exhausted += 1
+                return None
+            self.retries += 1
+
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+        logger.warning(f"⏳ LLM request got {status}, retrying in {max(delay, retry_after or 0):.1f}s (attempt {attempt + 1}/{self.max_retries})")
+        return max(delay, retry_after or 0)
+
+    @staticmethod
+    def _token_adjustment(estimated_tokens: int, response: Any) -> float:
+        try:
+            return estimated_tokens - response["usage"]["total_tokens"]
+        except (KeyError, TypeError):
+            return 0.0
+
+    # Entry points
+
+    def run(self, request: Callable[[], Any], priority: int = PRIORITY_STANDARD, estimated_tokens: int = 0) -> Any:
+        """Run a blocking provider request under the scheduler, retrying rate limits"""
+        seq = next(self._seq)
+        attempt = 0
+        while True:
+            self._acquire(priority, seq, estimated_tokens)
+            try:
+                response = request()
+            except Exception as e:
+                self._release(success=False)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release(success=True, token_adjustment=self._token_adjustment(estimated_tokens, response))
+            return response
+
+    async def run_async(self, request: Callable[[], Awaitable[Any]], priority: int = PRIORITY_STANDARD, estimated_tokens: int = 0) -> Any:
+        """Async variant of run; retries keep their original place in line"""
+        response = await self._admit_async(request, priority, estimated_tokens)
+        self._release(success=True, token_adjustment=self._token_adjustment(estimated_tokens, response))
+        return response
+
+    async def run_stream_async(self, request: Callable[[], Awaitable[Any]], priority: int = PRIORITY_STANDARD, estimated_tokens: int = 0) -> "HeldStream":
+        """
+        run_async for a streamed response: request() opens the stream, and
+        the permit stays held until the stream is exhausted or closed, so a
+        streaming reply counts against the concurrency limit for as long as
+        it is actually in flight.
+        """
+        stream = await self._admit_async(request, priority, estimated_tokens)
+        return HeldStream(stream, self._release)
+
+    async def _admit_async(self, request: Callable[[], Awaitable[Any]], priority: int, estimated_tokens: int) -> Any:
+        """Take a permit and run request(), retrying rate limits; returns with the permit still held"""
+        seq = next(self._seq)
+        attempt = 0
+        while True:
+            await self._acquire_async(priority, seq, estimated_tokens)
+            try:
+                response = await request()
+            except asyncio.CancelledError:
+                self._release(success=False)
+                raise
+            except Exception as e:
+                self._release(success=False)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            return response
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            queued: Dict[str, int] = {}
+            for waiter in self._queue:
+                if not waiter.cancelled:
+                    name = PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))
+                    queued[name] = queued.get(name, 0) + 1
+            if self.rpm_bucket:
+                self.rpm_bucket._refill(now)
+            if self.tpm_bucket:
+                self.tpm_bucket._refill(now)
+            return {
+                "concurrency_limit": self.limit,
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "queued": queued,
+                "rpm_available": int(self.rpm_bucket.tokens) if self.rpm_bucket else None,
+                "tpm_available": int(self.tpm_bucket.tokens) if self.tpm_bucket else None,
+                "completed": self.completed,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "retries_exhausted": self.exhausted
+            }
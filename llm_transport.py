@@ -0,0 +1,220 @@
+# Long-lived, pooled HTTP transport shared by every OpenAI call
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from llm_scheduler import PRIORITY_STANDARD, LLMScheduler, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiohttp
+    import openai
+    import requests
+    from requests.adapters import HTTPAdapter
+    HAS_TRANSPORT_DEPS = True
+except ImportError:
+    HAS_TRANSPORT_DEPS = False
+
+# Maximum open keep-alive connections to the API, per transport
+LLM_POOL_SIZE = max(1, int(os.getenv("LLM_POOL_SIZE", "32")))
+
+# Seconds to establish a connection, and to wait for a complete response
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+
+# Seconds an idle pooled connection is kept open for reuse
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+
+# Connection-level retries for the sync session (matches openai's own default)
+LLM_CONNECTION_RETRIES = 2
+
+
+def is_client_error(error: Exception) -> bool:
+    """
+    A 4xx other than 429, e.g. an invalid request (context length) or bad
+    credentials: the request's fault, not a sign the provider is degraded
+    """
+    status = getattr(error, "http_status", None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+def _record_error(breaker: Optional[CircuitBreaker], error: Exception):
+    if breaker is None:
+        return
+    if is_client_error(error):
+        breaker.release()
+    else:
+        breaker.record_failure()
+
+
+class LLMTransport:
+    """
+    One requests session and one aiohttp session, created once and reused,
+    so concurrent calls share warm TLS connections instead of handshaking
+    per request. openai 0.28 speaks HTTP/1.1 over requests/aiohttp only,
+    so reuse comes from keep-alive pooling rather than HTTP/2 multiplexing.
+    Every request is admitted through the rate-limit-aware scheduler, and
+    callers may guard a call with a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        pool_size: int = LLM_POOL_SIZE,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        keepalive_seconds: float = LLM_KEEPALIVE_SECONDS,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        if not HAS_TRANSPORT_DEPS:
+            raise RuntimeError("LLM transport requires the openai, requests and aiohttp libraries")
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_seconds = keepalive_seconds
+        self.requests_sent = 0
+        self.scheduler = scheduler or LLMScheduler()
+
+        # openai uses a Session instance assigned here for every sync call, from any thread
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=LLM_CONNECTION_RETRIES)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        openai.requestssession = self._session
+
+        # aiohttp sessions are bound to the loop that created them
+        self._async_session: Optional["aiohttp.ClientSession"] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def request_timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """Create the aiohttp session on first use in the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_seconds,
+                ttl_dns_cache=300
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector)
+            self._async_loop = loop
+            logger.info(f"🔌 LLM async connection pool opened ({self.pool_size} connections)")
+        return self._async_session
+
+    @staticmethod
+    def _check_breaker(breaker: Optional[CircuitBreaker]):
+        if breaker is not None and not breaker.allow_request():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+
+    def chat_completion(self, priority: int = PRIORITY_STANDARD, breaker: Optional[CircuitBreaker] = None, **params) -> Any:
+        """Blocking chat completion over the pooled requests session"""
+        latency_ms = 0.0
+
+        def request():
+            nonlocal latency_ms
+            with self._lock:
+                self.requests_sent += 1
+            started = time.perf_counter()
+            response = openai.ChatCompletion.create(api_key=self.api_key, request_timeout=self.request_timeout, **params)
+            latency_ms = (time.perf_counter() - started) * 1000
+            return response
+
+        self._check_breaker(breaker)
+        tokens = estimate_tokens(params.get("messages", []), params.get("max_tokens", 0))
+        try:
+            response = self.scheduler.run(request, priority, tokens)
+        except Exception as e:
+            _record_error(breaker, e)
+            raise
+        if breaker is not None:
+            breaker.record_success(latency_ms)
+        return response
+
+    async def chat_completion_async(self, priority: int = PRIORITY_STANDARD, breaker: Optional[CircuitBreaker] = None, **params) -> Any:
+        """
+        Async chat completion over the pooled aiohttp session.
+        With stream=True the request is already sent when this returns, and
+        the returned stream holds its scheduler permit until it is exhausted
+        or closed (aclose()).
+        The breaker sees the final outcome after rate-limit retries, timed
+        from the successful attempt so queueing never counts as slowness.
+        A call cancelled while its request is with the provider (typically
+        a deadline expiring on a hanging provider) counts as a failure; one
+        cancelled while still queued in the scheduler has no outcome.
+        """
+        latency_ms = 0.0
+        in_flight = False
+
+        async def request():
+            nonlocal latency_ms, in_flight
+            session = self._get_async_session()
+            self.requests_sent += 1
+            token = openai.aiosession.set(session)
+            started = time.perf_counter()
+            in_flight = True
+            try:
+                response = await openai.ChatCompletion.acreate(
+                    api_key=self.api_key,
+                    request_timeout=self.request_timeout,
+                    **params
+                )
+            except Exception:
+                # Settled: a retry backoff cancelled after this is not in flight
+                in_flight = False
+                raise
+            finally:
+                openai.aiosession.reset(token)
+            in_flight = False
+            latency_ms = (time.perf_counter() - started) * 1000
+            return response
+
+        self._check_breaker(breaker)
+        tokens = estimate_tokens(params.get("messages", []), params.get("max_tokens", 0))
+        try:
+            if params.get("stream"):
+                # The permit is held until the caller finishes reading the stream
+                response = await self.scheduler.run_stream_async(request, priority, tokens)
+            else:
+                response = await self.scheduler.run_async(request, priority, tokens)
+        except asyncio.CancelledError:
+            if breaker is not None:
+                if in_flight:
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+            raise
+        except Exception as e:
+            _record_error(breaker, e)
+            raise
+        if breaker is not None:
+            breaker.record_success(latency_ms)
+        return response
+
+    async def aclose(self):
+        """Close pooled connections; sessions are recreated on next use"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+            logger.info("🛑 LLM async connection pool closed")
+        self._async_session = None
+        self._session.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "connect_timeout_s": self.connect_timeout,
+            "read_timeout_s": self.read_timeout,
+            "keepalive_s": self.keepalive_seconds,
+            "http_version": "HTTP/1.1",
+            "async_pool_open": self._async_session is not None and not self._async_session.closed,
+            "requests_sent": self.requests_sent
+        }
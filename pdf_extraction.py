@@ -0,0 +1,131 @@
+# Shared PDF text extraction engine with per-page process parallelism
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import PyPDF2
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+    logger.warning("❌ PyPDF2 not available - PDF extraction disabled")
+
+# Number of worker processes used to extract page ranges in parallel
+PDF_EXTRACTION_WORKERS = max(1, int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1))))
+
+# Documents shorter than this are extracted in-process; pool dispatch costs more than it saves
+PDF_PARALLEL_MIN_PAGES = max(1, int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16")))
+
+
+# A PDF is either raw bytes or the path of a spooled file on disk
+PDFSource = Union[bytes, str, os.PathLike]
+
+
+@contextmanager
+def open_pdf_reader(source: PDFSource):
+    """
+    Open a PdfReader over bytes or a file path.
+    Files are memory-mapped so pages are paged in on demand rather than copied.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        yield PyPDF2.PdfReader(io.BytesIO(source))
+        return
+
+    with open(source, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            # mmap cannot map empty files; let PyPDF2 report the invalid PDF
+            yield PyPDF2.PdfReader(handle)
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PyPDF2.PdfReader(mapped)
+
+
+def _extract_page_range(source: PDFSource, start: int, stop: int) -> List[str]:
+    """Extract text for pages [start, stop) - runs inside a worker process"""
+    with open_pdf_reader(source) as reader:
+        return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split page_count pages into at most `parts` contiguous, near-equal ranges"""
+    parts = max(1, min(parts, page_count))
+    base, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        stop = start + base + (1 if part < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+class PDFExtractionEngine:
+    """Extracts PDF text, fanning large documents out across a process pool"""
+
+    def __init__(self, workers: int = PDF_EXTRACTION_WORKERS, min_parallel_pages: int = PDF_PARALLEL_MIN_PAGES):
+        self.workers = workers
+        self.min_parallel_pages = min_parallel_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use"""
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn avoids forking a process that already runs event-loop and executor threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"🧵 PDF extraction pool started with {self.workers} workers")
+            return self._pool
+
+    def extract_text(self, source: PDFSource) -> str:
+        """
+        Extract all page text in page order, joined once with newlines.
+        Pass a file path to keep memory flat: workers map the file themselves
+        instead of receiving a pickled copy of the document.
+        """
+        if not HAS_PYPDF2:
+            raise RuntimeError("PDF text extraction requires PyPDF2 library")
+
+        with open_pdf_reader(source) as reader:
+            page_count = len(reader.pages)
+            if self.workers <= 1 or page_count < self.min_parallel_pages:
+                return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+        pool = self._get_pool()
+        worker_source = source if isinstance(source, (bytes, bytearray)) else os.fspath(source)
+        futures = [
+            pool.submit(_extract_page_range, worker_source, start, stop)
+            for start, stop in split_page_ranges(page_count, self.workers)
+        ]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+
+        return "\n".join(pages)
+
+    def shutdown(self):
+        """Stop the worker processes if they were started"""
+        with self._pool_lock:
+            if self._pool is not None:
+                logger.info("🛑 Shutting down PDF extraction pool")
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+# Global extraction engine shared by the API and the rule-based analyzer
+pdf_engine = PDFExtractionEngine()
+
+def extract_pdf_text(source: PDFSource) -> str:
+    """Main function to extract text from PDF bytes or a PDF file path"""
+    return pdf_engine.extract_text(source)
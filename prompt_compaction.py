@@ -0,0 +1,142 @@
+# Token-budgeted LLM prompts built from rule-based pre-extraction
+import logging
+import os
+import re
+from typing import Any, Dict, List, NamedTuple
+
+from document_chunking import SECTION_HEADING, chunk_document
+from intelligent_analyzer import medical_analyzer
+from lab_scanner import lab_scanner
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+    HAS_TIKTOKEN = True
+except Exception:
+    # Not installed, or the encoding could not be loaded; fall back to an estimate
+    HAS_TIKTOKEN = False
+
+LLM_PROMPT_COMPACTION = os.getenv("LLM_PROMPT_COMPACTION", "true").lower() == "true"
+
+# Tokens of document content allowed in a single analysis prompt
+LLM_PROMPT_TOKEN_BUDGET = max(200, int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "800")))
+
+# Headers and footers that carry no clinical content
+ADMINISTRATIVE_LINE = re.compile(
+    r"\b(?:page\s+\d+|phone|fax|tel|address|mrn|account\s*(?:no|number|#)|npi|accession|printed\s+on)\b",
+    re.IGNORECASE
+)
+
+# Demographic fields already captured by _extract_demographics
+DEMOGRAPHIC_FIELD = re.compile(
+    r"\b(?:age|gender|sex|dob|patient(?:\s*name)?|(?:report\s*)?date)\s*:?\s*[^\s,;]*",
+    re.IGNORECASE
+)
+
+_WORD = re.compile(r"[A-Za-z]{3,}")
+
+# Reference-range flags next to a parsed value; the model can infer them from the value itself
+_FLAG_WORDS = {"normal", "high", "low", "borderline", "range", "ref", "reference", "flag", "result", "value", "units"}
+
+class CompactedDocument(NamedTuple):
+    """Document content to send, one entry per LLM call, and what compaction saved"""
+    parts: List[str]
+    stats: Dict[str, Any]
+
+
+def count_tokens(text: str) -> int:
+    """Model tokens in text (tiktoken when available, otherwise ~4 characters per token)"""
+    if HAS_TIKTOKEN:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _is_covered(line: str) -> bool:
+    """True when the rules extracted everything meaningful on this line"""
+    residue, lab_readings = lab_scanner.strip(line)
+    residue, demographic_fields = DEMOGRAPHIC_FIELD.subn(" ", residue)
+    return lab_readings + demographic_fields > 0 and len([word for word in _WORD.findall(residue) if word.lower() not in _FLAG_WORDS]) < 3
+
+
+def narrative_lines(text: str) -> List[str]:
+    """
+    Lines the rule-based extractors cannot represent, de-duplicated, in
+    document order. Headings are kept only when some of their content is.
+    """
+    seen = set()
+    kept = []
+    heading = None
+    for raw_line in text.splitlines():
+        line = " ".join(raw_line.split())
+        if not _WORD.search(line) or ADMINISTRATIVE_LINE.search(line) or _is_covered(line):
+            continue
+        if SECTION_HEADING.match(line):
+            heading = line
+            continue
+        key = line.lower()
+        if key not in seen:
+            seen.add(key)
+            if heading is not None:
+                kept.append(heading)
+                heading = None
+            kept.append(line)
+    return kept
+
+
+def structured_summary(report_type: str, demographics: Dict[str, Any], lab_values: Dict[str, Any]) -> str:
+    """Pre-extracted facts in a compact, model-readable form (patient names are left out)"""
+    lines = ["PRE-EXTRACTED FACTS:", f"Report type: {report_type}"]
+    patient = ", ".join(f"{field.replace('_', ' ')} {demographics[field]}" for field in ("age", "gender", "report_date") if field in demographics)
+    if patient:
+        lines.append(f"Patient: {patient}")
+    if lab_values:
+        lines.append("Lab values:")
+        for name, result in lab_values.items():
+            unit = result.get("unit") or medical_analyzer.medical_terms.get(name, {}).get("units", "")
+            lines.append(f"- {name}: {result['value']:g} {unit}".rstrip())
+    return "\n".join(lines)
+
+
+def compact_document(text: str, token_budget: int = LLM_PROMPT_TOKEN_BUDGET, max_parts: int = 12) -> CompactedDocument:
+    """
+    Replace the raw document with the rule-extracted facts plus only the
+    narrative lines the rules cannot parse. Narrative longer than one prompt
+    is split on section boundaries so every part stays within token_budget;
+    beyond max_parts prompts the remaining narrative is dropped.
+    """
+    report_type = medical_analyzer._detect_report_type(text)
+    lab_values = medical_analyzer._extract_lab_values(text)
+    demographics = medical_analyzer._extract_demographics(text)
+
+    structured = structured_summary(report_type, demographics, lab_values)
+    narrative = "\n".join(narrative_lines(text))
+
+    narrative_budget = max(100, token_budget - count_tokens(structured))
+    narrative_tokens = count_tokens(narrative)
+    truncated = narrative_tokens > narrative_budget * max_parts
+    if truncated:
+        cut = len(narrative) * narrative_budget * max_parts // narrative_tokens
+        narrative = narrative[:cut].rsplit("\n", 1)[0]
+        narrative_tokens = count_tokens(narrative)
+
+    if narrative:
+        chars_per_token = len(narrative) / max(1, narrative_tokens)
+        pieces = chunk_document(narrative, max(200, int(narrative_budget * chars_per_token)))
+        parts = [f"{structured}\n\nNARRATIVE EXCERPTS:\n{piece}" for piece in pieces]
+    else:
+        parts = [structured]
+
+    raw_tokens = count_tokens(text)
+    sent_tokens = sum(count_tokens(part) for part in parts)
+    stats = {
+        "raw_document_tokens": raw_tokens,
+        "prompt_document_tokens": sent_tokens,
+        "tokens_saved": raw_tokens - sent_tokens,
+        "reduction": round(raw_tokens / sent_tokens, 2) if sent_tokens else None,
+        "narrative_truncated": truncated,
+        "token_budget": token_budget,
+        "tokenizer": "tiktoken" if HAS_TIKTOKEN else "approximate"
+    }
+    return CompactedDocument(parts, stats)
@@ -0,0 +1,106 @@
+# Compact typed records for analysis results, and direct JSON serialization of them
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+try:
+    # Serializes dataclasses natively, straight to JSON bytes
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+class _Record:
+    """
+    Key access on top of attributes. Cached analyses come back from JSON as
+    plain dicts, so code that reads both fresh and cached results (follow-up
+    context, routing) keeps using `record["name"]` / `record.get("name")`.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+
+@dataclass(slots=True)
+class LabValue(_Record):
+    """One extracted lab reading"""
+    value: float
+    unit: str
+
+
+@dataclass(slots=True)
+class Finding(_Record):
+    """A lab value against its reference range"""
+    test: str
+    value: str
+    status: str
+    severity: str
+    reference_range: str
+
+
+@dataclass(slots=True)
+class TextFinding(_Record):
+    """Text around a severity keyword"""
+    finding: str
+    severity: str
+    source: str = 'text_analysis'
+
+
+@dataclass(slots=True)
+class Condition(_Record):
+    """A condition suggested by the lab pattern"""
+    name: str
+    confidence: str
+    evidence: List[str]
+    explanation: str
+    complications_risk: str
+    management: str
+
+
+@dataclass(slots=True)
+class RiskFactor(_Record):
+    """Score of one risk category and what contributed to it"""
+    category: str
+    score: int
+    factors: List[str]
+    recommendation: str
+
+
+@dataclass(slots=True)
+class RiskAssessment(_Record):
+    overall_risk: str
+    risk_score: int
+    risk_percentage: int
+    risk_factors: List[RiskFactor]
+    severity_distribution: Dict[str, int]
+
+
+def _record_fields(value: Any) -> Dict[str, Any]:
+    # Only reached without orjson, or for types orjson does not know
+    if isinstance(value, _Record):
+        return {name: getattr(value, name) for name in value.__slots__}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON of a value that may contain result records"""
+    if HAS_ORJSON:
+        return orjson.dumps(value, default=_record_fields)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_record_fields).encode("utf-8")
+
+
+def dumps_text(value: Any) -> str:
+    """dumps() as text, for TEXT columns and text streams"""
+    return dumps(value).decode("utf-8")
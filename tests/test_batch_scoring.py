@@ -0,0 +1,38 @@
+import pytest
+
+from intelligent_analyzer import medical_analyzer
+
+DOCUMENTS = [
+    "Routine check-up. Glucose: 92 mg/dL Total Cholesterol: 180 mg/dL HDL: 55 mg/dL Hemoglobin: 14.2 g/dL",
+    "Laboratory report. Glucose: 130 mg/dL HbA1c: 6.8% Cholesterol: 250 mg/dL LDL: 165 mg/dL",
+    "Emergency labs. Glucose: 420 mg/dL Potassium: 6.8 mEq/L Creatinine: 4.2 mg/dL Severe chest pain, critical condition.",
+    "Hemoglobin: 6.1 g/dL Platelets: 40 K/uL WBC: 1.2 K/uL Patient reports fatigue and mild dizziness.",
+    "Follow-up visit. Blood pressure 150/95. History of hypertension and type 2 diabetes. ALT: 88 U/L AST: 90 U/L",
+    "Discharge summary. No acute distress. Patient doing well, no abnormal findings.",
+    "",
+]
+
+FIELDS = ("risk_score", "risk_percentage", "overall_risk")
+
+
+@pytest.fixture(scope="module")
+def records():
+    return list(medical_analyzer.analyze_many(DOCUMENTS).records())
+
+
+@pytest.mark.parametrize("index", range(len(DOCUMENTS)))
+def test_batch_scores_match_per_document_analysis(records, index):
+    record = records[index]
+    result = medical_analyzer.analyze_medical_document(DOCUMENTS[index], "report.txt")
+
+    doctor = result["doctor_summary"]["risk_assessment"]
+    patient = result["patient_summary"]["risk_analysis"]
+    assert tuple(record[field] for field in FIELDS) == tuple(doctor[field] for field in FIELDS)
+    assert (record["condition_risk_score"], record["condition_risk_percentage"], record["condition_risk"]) == tuple(
+        patient[field] for field in FIELDS
+    )
+
+
+def test_batch_covers_several_risk_levels(records):
+    levels = {record["overall_risk"] for record in records}
+    assert len(levels) >= 3
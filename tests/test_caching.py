@@ -0,0 +1,130 @@
+import os
+import time
+
+import pytest
+
+from caching import DiskCache, PromptCache, SQLiteResponseStore, TTLLRUCache, normalize_prompt
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def test_memory_cache_expires_entries(clock):
+    cache = TTLLRUCache(max_entries=4, ttl_seconds=60)
+    cache.set("a", 1)
+    clock.advance(59)
+    assert cache.get("a") == 1
+    clock.advance(2)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_memory_cache_evicts_least_recently_used(clock):
+    cache = TTLLRUCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_memory_cache_disabled_with_no_entries():
+    cache = TTLLRUCache(max_entries=0, ttl_seconds=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_disk_cache_round_trip_and_reload(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+    cache.set("a", {"risk": "low"})
+    assert cache.get("a") == {"risk": "low"}
+
+    reloaded = DiskCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+    assert reloaded.get("a") == {"risk": "low"}
+    assert reloaded.status()["entries"] == 1
+
+
+def test_disk_cache_expires_entries(tmp_path, clock):
+    cache = DiskCache(str(tmp_path), max_bytes=1024, ttl_seconds=60)
+    cache.set("a", {"risk": "low"})
+    clock.advance(61)
+    assert cache.get("a") is None
+    assert not os.path.exists(tmp_path / "a.json")
+    assert cache.status()["bytes"] == 0
+
+
+def test_disk_cache_evicts_least_recently_used_by_size(tmp_path, clock):
+    value = {"text": "x" * 40}
+    cache = DiskCache(str(tmp_path), max_bytes=150, ttl_seconds=60)
+    cache.set("a", value)
+    clock.advance(1)
+    cache.set("b", value)
+    clock.advance(1)
+    assert cache.get("a") == value
+    clock.advance(1)
+    cache.set("c", value)
+    assert cache.get("b") is None
+    assert cache.get("a") == value and cache.get("c") == value
+    assert cache.evictions == 1
+    assert cache.status()["bytes"] <= 150
+
+
+def test_disk_cache_skips_values_larger_than_budget(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10, ttl_seconds=60)
+    cache.set("a", {"text": "x" * 40})
+    assert cache.get("a") is None
+
+
+def test_sqlite_store_expires_and_evicts(tmp_path, clock):
+    store = SQLiteResponseStore(str(tmp_path / "prompts.sqlite3"), max_entries=2, ttl_seconds=60)
+    store.set("a", {"response": 1})
+    clock.advance(1)
+    store.set("b", {"response": 2})
+    clock.advance(1)
+    assert store.get("a") == {"response": 1}
+    clock.advance(1)
+    store.set("c", {"response": 3})
+    assert store.get("b") is None
+    assert len(store) == 2 and store.evictions == 1
+
+    clock.advance(61)
+    assert store.get("a") is None
+
+
+def test_prompt_cache_counts_hits_and_normalizes_prompts():
+    cache = PromptCache(TTLLRUCache(max_entries=4, ttl_seconds=60), "memory")
+    first = PromptCache.make_key("gpt-4o-mini", 0.3, 500, [{"role": "user", "content": "What is  my glucose?"}])
+    second = PromptCache.make_key("gpt-4o-mini", 0.3, 500, [{"role": "user", "content": "what is my glucose"}])
+    assert normalize_prompt("What is  my glucose?") == normalize_prompt("what is my glucose")
+    assert first == second
+
+    assert cache.get(first) is None
+    cache.set(first, {"response": "ok"})
+    assert cache.get(second) == {"response": "ok"}
+    status = cache.status()
+    assert (status["hits"], status["misses"], status["stores"]) == (1, 1, 1)
+    assert status["entries"] == 1
+
+
+def test_prompt_cache_off():
+    cache = PromptCache(None, "off")
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.status()["backend"] == "off"
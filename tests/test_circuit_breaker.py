@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from llm_scheduler import LLMScheduler
+from llm_transport import LLMTransport
+
+
+def make_breaker(**overrides):
+    settings = dict(window=4, min_calls=2, failure_rate=0.5, slow_call_ms=1000, open_seconds=0.05, half_open_probes=1)
+    settings.update(overrides)
+    return CircuitBreaker("test", **settings)
+
+
+def wait_half_open(breaker):
+    time.sleep(breaker.open_seconds + 0.01)
+    assert breaker.state == HALF_OPEN
+
+
+def test_closed_open_half_open_closed():
+    breaker = make_breaker()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.short_circuited == 1
+
+    wait_half_open(breaker)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success(10)
+    assert breaker.state == CLOSED
+    assert breaker.status()["window_calls"] == 0
+
+
+def test_failed_probe_reopens():
+    breaker = make_breaker(min_calls=1)
+    breaker.record_failure()
+    wait_half_open(breaker)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+
+def test_slow_success_counts_as_failure():
+    breaker = make_breaker(min_calls=1)
+    breaker.record_success(5000)
+    assert breaker.state == OPEN
+
+
+def test_release_returns_probe_slot():
+    breaker = make_breaker(min_calls=1)
+    breaker.record_failure()
+    wait_half_open(breaker)
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+class FakeError(Exception):
+    def __init__(self, http_status):
+        super().__init__(f"HTTP {http_status}")
+        self.http_status = http_status
+
+
+@pytest.fixture
+def transport():
+    return LLMTransport(api_key="test", scheduler=LLMScheduler())
+
+
+async def call(transport, breaker, timeout=None):
+    try:
+        return await asyncio.wait_for(
+            transport.chat_completion_async(breaker=breaker, model="gpt-3.5-turbo", messages=[], max_tokens=10),
+            timeout=timeout
+        )
+    finally:
+        await transport.aclose()
+
+
+def run_call(transport, breaker, timeout=None):
+    return asyncio.run(call(transport, breaker, timeout))
+
+
+def test_cancelled_in_flight_call_reopens_probe(transport, monkeypatch):
+    async def hang(**params):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", hang)
+    breaker = make_breaker(min_calls=1)
+    breaker.record_failure()
+    wait_half_open(breaker)
+
+    with pytest.raises(asyncio.TimeoutError):
+        run_call(transport, breaker, timeout=0.05)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        run_call(transport, breaker)
+
+
+def test_cancelled_in_flight_calls_trip_closed_circuit(transport, monkeypatch):
+    async def hang(**params):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", hang)
+    breaker = make_breaker()
+
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            run_call(transport, breaker, timeout=0.05)
+    assert breaker.state == OPEN
+
+
+def test_client_errors_do_not_trip(transport, monkeypatch):
+    async def reject(**params):
+        raise FakeError(400)
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", reject)
+    breaker = make_breaker()
+    for _ in range(4):
+        with pytest.raises(FakeError):
+            run_call(transport, breaker)
+    assert breaker.state == CLOSED
+    assert breaker.status()["window_calls"] == 0
+
+
+def test_server_errors_trip_then_success_closes(transport, monkeypatch):
+    async def fail(**params):
+        raise FakeError(500)
+
+    async def succeed(**params):
+        return {"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 10}}
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", fail)
+    breaker = make_breaker()
+    for _ in range(2):
+        with pytest.raises(FakeError):
+            run_call(transport, breaker)
+    assert breaker.state == OPEN
+
+    wait_half_open(breaker)
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", succeed)
+    assert run_call(transport, breaker)["choices"][0]["message"]["content"] == "ok"
+    assert breaker.state == CLOSED
@@ -0,0 +1,77 @@
+import asyncio
+
+from job_queue import COMPLETED, FAILED, STAGE_DONE, JobQueue, JobStore
+
+
+def make_queue(tmp_path):
+    return JobQueue(store=JobStore(str(tmp_path / "jobs.sqlite3")), workers=1)
+
+
+def test_submit_runs_to_completion(tmp_path):
+    async def handler(job, report_stage):
+        await report_stage("extract")
+        await report_stage("analyze")
+        return {"echo": job["payload"]["text"]}
+
+    async def scenario():
+        queue = make_queue(tmp_path)
+        await queue.start(handler)
+        try:
+            job_id = await queue.submit("analysis", {"text": "hello"}, ["extract", "analyze"])
+            for _ in range(100):
+                changed = queue.watch(job_id)
+                try:
+                    job = await queue.get(job_id)
+                    if job["status"] in (COMPLETED, FAILED):
+                        return job, queue.status()
+                    await asyncio.wait_for(changed.wait(), 1)
+                finally:
+                    queue.unwatch(job_id, changed)
+        finally:
+            await queue.stop()
+
+    job, status = asyncio.run(scenario())
+    assert job["status"] == COMPLETED
+    assert job["result"] == {"echo": "hello"}
+    assert set(job["progress"].values()) == {STAGE_DONE}
+    assert status["watched"] == 0
+
+
+def test_failed_job_records_error(tmp_path):
+    async def handler(job, report_stage):
+        raise ValueError("unreadable document")
+
+    async def scenario():
+        queue = make_queue(tmp_path)
+        await queue.start(handler)
+        try:
+            job_id = await queue.submit("analysis", {}, ["extract"])
+            for _ in range(100):
+                job = await queue.get(job_id)
+                if job["status"] in (COMPLETED, FAILED):
+                    return job
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert job["error"] == "unreadable document"
+
+
+def test_watchers_are_notified_and_dropped(tmp_path):
+    async def scenario():
+        queue = make_queue(tmp_path)
+        first = queue.watch("job")
+        second = queue.watch("job")
+        queue.unwatch("job", first)
+        queue._notify("job")
+        assert second.is_set() and not first.is_set()
+        assert queue.status()["watched"] == 0
+
+        # A watcher that leaves without a notification must not leak its entry
+        abandoned = queue.watch("other")
+        queue.unwatch("other", abandoned)
+        assert queue.status()["watched"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from llm_scheduler import LLMScheduler
+
+
+async def token_stream(tokens):
+    for token in tokens:
+        yield token
+
+
+def make_scheduler(max_concurrency=1):
+    return LLMScheduler(rpm=0, tpm=0, max_concurrency=max_concurrency, max_retries=0)
+
+
+def test_run_async_releases_permit():
+    scheduler = make_scheduler()
+
+    async def request():
+        assert scheduler.active == 1
+        return {"usage": {"total_tokens": 5}}
+
+    asyncio.run(scheduler.run_async(request))
+    assert scheduler.active == 0
+
+
+def test_stream_holds_permit_until_exhausted():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        async def request():
+            return token_stream(["a", "b", "c"])
+
+        stream = await scheduler.run_stream_async(request)
+        assert scheduler.active == 1
+        tokens = [token async for token in stream]
+        assert tokens == ["a", "b", "c"]
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_closed_early_releases_permit_once():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        source = token_stream(["a", "b", "c"])
+
+        async def request():
+            return source
+
+        stream = await scheduler.run_stream_async(request)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        assert scheduler.active == 0
+        await stream.aclose()
+        assert scheduler.active == 0
+        with pytest.raises(StopAsyncIteration):
+            await source.__anext__()
+
+    asyncio.run(scenario())
+
+
+def test_held_stream_blocks_next_admission():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        async def open_stream():
+            return token_stream(["a"])
+
+        async def request():
+            return "second"
+
+        stream = await scheduler.run_stream_async(open_stream)
+        second = asyncio.create_task(scheduler.run_async(request))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        await stream.aclose()
+        assert await asyncio.wait_for(second, 1) == "second"
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_failing_stream_releases_permit():
+    scheduler = make_scheduler()
+
+    async def broken():
+        yield "a"
+        raise ConnectionError("reset")
+
+    async def scenario():
+        async def request():
+            return broken()
+
+        stream = await scheduler.run_stream_async(request)
+        with pytest.raises(ConnectionError):
+            async for _ in stream:
+                pass
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,87 @@
+# Bounded-memory upload spooling for document endpoints
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Largest accepted upload; anything bigger is rejected with 413
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+
+# Largest accepted request body for multi-document batch uploads
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_MB", "500")) * 1024 * 1024
+
+# Copy granularity - the only part of an upload ever held in memory at once
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Allowance for multipart boundaries and headers when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class SpooledFile(NamedTuple):
+    """An upload copied to disk, with its size and SHA-256 computed during the copy"""
+    path: str
+    size: int
+    sha256: str
+
+
+def upload_too_large(content_length: Optional[str], max_bytes: int = MAX_UPLOAD_BYTES) -> bool:
+    """Check a request's declared Content-Length against the upload cap"""
+    try:
+        return content_length is not None and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES
+    except ValueError:
+        return False
+
+
+def _write_chunk(handle, digest, chunk: bytes):
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES, directory: Optional[str] = None) -> SpooledFile:
+    """
+    Stream an upload to a named temporary file in fixed-size chunks.
+    Hashing and disk writes run in a worker thread to keep the loop free.
+    The caller owns deleting the returned file.
+    """
+    handle = tempfile.NamedTemporaryFile(prefix="medisure_", suffix=".pdf", dir=directory, delete=False)
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with handle:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB."
+                    )
+                await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+
+    logger.info(f"📥 Spooled upload {upload.filename} ({written} bytes) to disk")
+    return SpooledFile(handle.name, written, digest.hexdigest())
+
+
+@asynccontextmanager
+async def spooled_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES):
+    """Spool an upload for the duration of a request and remove it afterwards"""
+    spooled = await spool_upload(upload, max_bytes)
+    try:
+        yield spooled
+    finally:
+        try:
+            os.unlink(spooled.path)
+        except OSError:
+            pass